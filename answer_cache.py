@@ -0,0 +1,259 @@
+"""
+Kişiye özel olmayan sorular için anlamsal yanıt önbelleği.
+
+Paket kataloğu ve SSS türü sorular (get_all_package, get_packages_by_type, rag_search)
+müşterinin hesabına bağlı değildir, buna rağmen her biri yerel LLM üzerinde tam bir
+ReAct döngüsü çalıştırır. Bu modül, kişiye özel olmadığı sınıflandırılan turlarda soruyu
+e5 ile vektöre çevirir ve daha önce verilmiş bir yanıtın sorusuna benzerliği
+ANSWER_CACHE_THRESHOLD'u geçiyorsa o yanıtı doğrudan döner.
+
+Önbellek kayıtları paket kataloğunun (GET /packages/) özetine bağlıdır; katalog
+değiştiğinde tüm kayıtlar geçersiz olur. İsabet oranı ve tahmini kazanılan süre
+stats() ile (api_server'da GET /api/v1/cache/stats) izlenebilir.
+"""
+import asyncio
+import hashlib
+import logging
+import re
+import time
+import typing
+
+import numpy as np
+from langchain_core.callbacks import AsyncCallbackHandler
+
+import config
+import telemetry
+from utils import lower_tr
+
+logger = logging.getLogger(__name__)
+
+# Yalnızca bu araçlarla (veya hiç araç kullanmadan) üretilen yanıtlar önbelleğe yazılır
+CACHEABLE_TOOLS = {"get_all_package", "get_packages_by_type", "get_package_by_name", "rag_search"}
+
+# Araçların hata durumunda döndürdüğü metinler (main.py); bu çıktılarla üretilen yanıtlar saklanmaz
+_TOOL_ERROR_PATTERN = re.compile(
+    r"^(Sistem hatası|RAG arama hatası|RAG dosyaları bulunamadı)|HTTP \d{3}|"
+    r"(sorgulanamadı|alınamadı|oluşturulamadı)\b|daha sonra tekrar deneyin|[Tt]imeout|zaman aşımı"
+)
+
+# Telefon numarası, hesap/kişi bildiren birinci tekil şahıs ifadeleri ve konuma bağlı arıza bildirimleri
+_PERSONAL_PATTERN = re.compile(
+    r"\d{7,}"
+    r"|\b(ben|benim|bana|beni|bende|adım|kayıt ol\w*|kaydol\w*|kaydım\w*)\b"
+    r"|\b\w*(numaram|faturam|paketim|hattım|hakkım|haklarım|aboneliğim|hesabım|kullanımım|hızım|bağlantım|"
+    r"modemim|bölgem|bulunduğum|evim|adresim|borcum|ödemem|tarifem|internetim|hizmetlerim|kalan)\w*"
+    r"|arıza|sorun|yavaş|kesinti|çekmiyor"
+)
+# Önceki turlara atıf yapan sorular (örn. "En ucuzu hangisi?") tek başına anlamlı değildir
+_CONTEXTUAL_PATTERN = re.compile(
+    r"\b(bu|şu|o|bunu|şunu|onu|bunun|onun|bunlar\w*|onlar\w*|hangisi\w*|ilki\w*|ikincisi\w*|"
+    r"sonuncusu\w*|ucuzu\w*|pahalısı\w*|peki|aynı)\b"
+)
+# Katalog/SSS konuları
+_TOPIC_PATTERN = re.compile(
+    r"paket|tarife|internet|fiber|mobil|ekstra|kampanya|fiyat|ücret|\bgb\b|dakika|\bsms\b|"
+    r"taşı|roaming|yurt ?dışı|modem|fatura|ödeme|hat\b|numara taşıma"
+)
+
+
+def is_cacheable(message: str, has_history: bool = False) -> bool:
+    """Turun hesaba bağlı olmayan, kendi başına anlamlı bir katalog/SSS sorusu olup olmadığını döner."""
+    text = lower_tr(message)
+    if _PERSONAL_PATTERN.search(text) or not _TOPIC_PATTERN.search(text):
+        return False
+    return not (has_history and _CONTEXTUAL_PATTERN.search(text))
+
+
+def is_tool_error(output) -> bool:
+    """Araç çıktısının bir hata mesajı olup olmadığını döner."""
+    return bool(_TOOL_ERROR_PATTERN.search(str(getattr(output, "content", output))))
+
+
+class ToolRecorder(AsyncCallbackHandler):
+    """Turda çağrılan araçların adlarını ve başarısız olanları (hata veya hata metni dönen) toplar."""
+
+    def __init__(self):
+        self.tools: typing.List[str] = []
+        self.failed: typing.List[str] = []
+        self._names: typing.Dict[typing.Any, str] = {}
+
+    async def on_tool_start(self, serialized, input_str, *, run_id=None, **kwargs):
+        name = (serialized or {}).get("name") or "unknown"
+        self.tools.append(name)
+        self._names[run_id] = name
+
+    async def on_tool_end(self, output, *, run_id=None, **kwargs):
+        name = self._names.pop(run_id, "unknown")
+        if is_tool_error(output):
+            self.failed.append(name)
+
+    async def on_tool_error(self, error, *, run_id=None, **kwargs):
+        self.failed.append(self._names.pop(run_id, "unknown"))
+
+
+class CacheLookup:
+    """Bir arama sonucu; ıska durumunda vektör, yanıt kaydedilirken yeniden kullanılır."""
+
+    def __init__(self, answer: str = None, vector=None, similarity: float = 0.0, catalog_version: str = None):
+        self.answer = answer
+        self.vector = vector
+        self.similarity = similarity
+        self.catalog_version = catalog_version
+
+
+class AnswerCache:
+    def __init__(self,
+                 fetch_catalog: typing.Callable[[], typing.Awaitable[bytes]] = None,
+                 embed: typing.Callable[[str], np.ndarray] = None,
+                 threshold: float = None,
+                 max_entries: int = None,
+                 ttl_seconds: float = None,
+                 catalog_check_seconds: float = None):
+        self.fetch_catalog = fetch_catalog
+        self.embed = embed
+        self.threshold = threshold if threshold is not None else config.ANSWER_CACHE_THRESHOLD
+        self.max_entries = max_entries if max_entries is not None else config.ANSWER_CACHE_MAX_ENTRIES
+        self.ttl_seconds = ttl_seconds if ttl_seconds is not None else config.ANSWER_CACHE_TTL_SECONDS
+        self.catalog_check_seconds = (catalog_check_seconds if catalog_check_seconds is not None
+                                      else config.ANSWER_CACHE_CATALOG_CHECK_SECONDS)
+
+        # Kayıtlar eklenme sırasıyla tutulur; vektörler tek matriste, aynı sırada
+        self._questions: typing.List[str] = []
+        self._answers: typing.List[str] = []
+        self._created_at: typing.List[float] = []
+        self._vectors: typing.Optional[np.ndarray] = None
+        self._catalog_version: typing.Optional[str] = None
+        self._catalog_checked_at: typing.Optional[float] = None
+        self._catalog_available = False
+        self._catalog_lock = asyncio.Lock()
+
+        self._counts = {"hit": 0, "miss": 0, "bypass": 0}
+        self._seconds = {"hit": 0.0, "miss": 0.0, "bypass": 0.0}
+        self._invalidations = 0
+
+    def __len__(self):
+        return len(self._answers)
+
+    def clear(self):
+        self._questions, self._answers, self._created_at = [], [], []
+        self._vectors = None
+
+    async def _embed(self, text: str) -> np.ndarray:
+        if self.embed is None:
+            import rag
+            return await asyncio.to_thread(rag.embed_query, text)
+        return await asyncio.to_thread(self.embed, text)
+
+    async def catalog_version(self) -> typing.Optional[str]:
+        """Katalog özetini döner; kontrol aralığı dolduysa yeniden çeker, değiştiyse önbelleği boşaltır."""
+        if self.fetch_catalog is None:
+            return "static"
+        if not self._catalog_check_due():
+            return self._catalog_version if self._catalog_available else None
+        async with self._catalog_lock:
+            if not self._catalog_check_due():
+                return self._catalog_version if self._catalog_available else None
+            self._catalog_checked_at = time.monotonic()
+            try:
+                version = hashlib.sha1(await self.fetch_catalog()).hexdigest()[:16]
+            except Exception as e:
+                # Katalog doğrulanamazken (bir sonraki kontrole kadar) önbellekten yanıt verilmez
+                logger.warning("Paket kataloğu alınamadı, yanıt önbelleği atlanıyor: %s", e)
+                self._catalog_available = False
+                return None
+            if self._catalog_version is not None and version != self._catalog_version:
+                logger.info("Paket kataloğu değişti, %d önbellek kaydı silindi", len(self))
+                self._invalidations += 1
+                self.clear()
+            self._catalog_version = version
+            self._catalog_available = True
+            return version
+
+    def _catalog_check_due(self) -> bool:
+        return (self._catalog_checked_at is None
+                or time.monotonic() - self._catalog_checked_at >= self.catalog_check_seconds)
+
+    async def lookup(self, message: str) -> CacheLookup:
+        with telemetry.span(telemetry.ANSWER_CACHE_LOOKUP_SECONDS):
+            version = await self.catalog_version()
+            if version is None:
+                return CacheLookup()
+            try:
+                vector = await self._embed(message)
+            except Exception as e:
+                logger.warning("Yanıt önbelleği için soru vektörü üretilemedi: %s", e)
+                return CacheLookup(catalog_version=version)
+            self._expire()
+            if self._vectors is None:
+                return CacheLookup(vector=vector, catalog_version=version)
+            scores = self._vectors @ vector
+            best = int(np.argmax(scores))
+            similarity = float(scores[best])
+            if similarity >= self.threshold:
+                logger.debug("Yanıt önbelleği isabeti (%.3f): %r ~ %r", similarity, message, self._questions[best])
+                return CacheLookup(self._answers[best], vector, similarity, version)
+            return CacheLookup(vector=vector, similarity=similarity, catalog_version=version)
+
+    def store(self, message: str, answer: str, lookup: CacheLookup, recorder: ToolRecorder,
+              has_history: bool = False):
+        """Yanıt yalnızca geçmişi olmayan bir turda katalog/SSS araçlarıyla, hatasız üretildiyse ve
+        katalog o arada değişmediyse kaydedilir."""
+        if lookup.vector is None or not answer or any(tool not in CACHEABLE_TOOLS for tool in recorder.tools):
+            return
+        # Agent chat_history'deki ad/telefon bilgisini yanıta katabilir ("Ahmet Bey, 0555... hattınız için")
+        if has_history:
+            return
+        # Başarısız araç çıktısından üretilen yanıt (örn. "HTTP 503 hatası") başka müşterilere dönmemeli
+        if recorder.failed:
+            logger.debug("Araç hatası nedeniyle yanıt önbelleğe alınmadı: %s", recorder.failed)
+            return
+        # AgentExecutor'un iterasyon sınırı mesajı gerçek bir yanıt değildir
+        if answer.startswith("Agent stopped"):
+            return
+        if lookup.catalog_version != self._catalog_version:
+            return
+        self._questions.append(message)
+        self._answers.append(answer)
+        self._created_at.append(time.monotonic())
+        row = lookup.vector.reshape(1, -1).astype("float32")
+        self._vectors = row if self._vectors is None else np.vstack([self._vectors, row])
+        if len(self) > self.max_entries:
+            self._drop(len(self) - self.max_entries)
+
+    def _expire(self):
+        cutoff = time.monotonic() - self.ttl_seconds
+        expired = next((i for i, created in enumerate(self._created_at) if created >= cutoff), len(self))
+        if expired:
+            self._drop(expired)
+
+    def _drop(self, count: int):
+        """En eski count kaydı siler."""
+        del self._questions[:count], self._answers[:count], self._created_at[:count]
+        self._vectors = self._vectors[count:] if len(self) else None
+
+    def record(self, result: str, seconds: float):
+        """Turun sonucunu (hit, miss, bypass) ve süresini kaydeder."""
+        self._counts[result] += 1
+        self._seconds[result] += seconds
+        telemetry.ANSWER_CACHE_REQUESTS.labels(result=result).inc()
+
+    def stats(self) -> dict:
+        hits, misses = self._counts["hit"], self._counts["miss"]
+        mean_hit = self._seconds["hit"] / hits if hits else 0.0
+        mean_miss = self._seconds["miss"] / misses if misses else 0.0
+        total = sum(self._counts.values())
+        return {
+            "entries": len(self),
+            "hits": hits,
+            "misses": misses,
+            "bypassed": self._counts["bypass"],
+            # Önbelleğe uygun turlar içinde isabet oranı
+            "hit_ratio": hits / (hits + misses) if hits + misses else 0.0,
+            "hit_ratio_all_turns": hits / total if total else 0.0,
+            "mean_hit_ms": mean_hit * 1000,
+            "mean_miss_ms": mean_miss * 1000,
+            # İsabetler agent döngüsü çalışsaydı ortalama ıska süresi kadar sürecekti
+            "estimated_saved_seconds": hits * max(mean_miss - mean_hit, 0.0) if misses else 0.0,
+            "invalidations": self._invalidations,
+            "catalog_version": self._catalog_version,
+        }
@@ -1,16 +1,48 @@
 from fastapi import FastAPI, HTTPException, UploadFile, File
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
+import typing
 import asyncio
-from main import tools, chat_with_memory
+from contextlib import asynccontextmanager
 from langsmith import traceable
 import uuid
-import whisper
 import tempfile
 import os
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, Response
+import logging
+import config
+import telemetry
+from startup import create_default_startup
+import session_store
+from session_store import SessionBusyError
 
-app = FastAPI(title="CallCenter Agent API", description="API for CallCenter AI Agent", version="1.0.0")
+telemetry.setup_logging()
+logger = logging.getLogger(__name__)
+
+# Whisper, agent (main.py), retriever ve LLM/backend kontrolleri import sırasında değil,
+# sunucu portu açtıktan sonra arka planda paralel yüklenir
+startup = create_default_startup()
+
+
+async def warm_up():
+    await startup.run()
+    # Geç açılan LLM sunucusu/backend gibi başarısız bileşenleri yeniden dene. Zorunlu olmayanlar
+    # (örn. retriever) da denenir; yoksa e5 müşteri isteklerinin içinde yüklenir
+    while startup.failed:
+        await asyncio.sleep(config.STARTUP_RETRY_SECONDS)
+        await startup.retry_failed()
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    task = asyncio.create_task(warm_up())
+    yield
+    task.cancel()
+    await session_store.get_store().close()
+
+
+app = FastAPI(title="CallCenter Agent API", description="API for CallCenter AI Agent", version="1.0.0",
+              lifespan=lifespan)
 
 # # CORS middleware - frontenden gelen isteklere izin ver
 app.add_middleware(
@@ -21,20 +53,33 @@ app.add_middleware(
      allow_headers=["*"],
  )
 
-model = whisper.load_model("small")
-
 # Request/Response modelleri
 class ChatRequest(BaseModel):
     message: str
     session_id: str = "default"
+    # Verilmezse TURN_DEADLINE_SECONDS uygulanır; TURN_DEADLINE_MAX_SECONDS'tan büyükse ona indirilir
+    deadline_seconds: typing.Optional[float] = Field(None, gt=0)
 
 class ChatResponse(BaseModel):
     response: str
     success: bool
     error: str = None
+    cached: bool = False
+    # Tur süresi dolduysa yanıt kısmi yanıt veya özür mesajıdır
+    deadline_exceeded: bool = False
+    partial: bool = False
 
-# Session management için basit bir cache
-sessions = {}
+def require_component(name: str):
+    """Yüklenmiş bileşeni döner; henüz hazır değilse 503 verir."""
+    value = startup.get(name)
+    if value is None:
+        component = startup.components[name]
+        raise HTTPException(
+            status_code=503,
+            detail=f"Servis henüz hazır değil ({name}: {component.status})",
+            headers={"Retry-After": "5"},
+        )
+    return value
 
 @app.get("/")
 async def root():
@@ -51,12 +96,18 @@ async def chat_with_agent(request: ChatRequest):
     """
     # Her API çağrısı için unique trace ID oluştur
     trace_id = str(uuid.uuid4())
+    agent = require_component("agent")
     
     try:
+        deadline_seconds = request.deadline_seconds
+        if deadline_seconds is not None:
+            deadline_seconds = min(deadline_seconds, config.TURN_DEADLINE_MAX_SECONDS)
+        
         # Memory ile agent'e mesajı gönder
-        response = await chat_with_memory(
+        response = await agent.chat_with_memory(
             message=request.message,
-            session_id=request.session_id
+            session_id=request.session_id,
+            deadline_seconds=deadline_seconds
         )
         
         # Agent yanıtını çıkar
@@ -64,11 +115,19 @@ async def chat_with_agent(request: ChatRequest):
         
         return ChatResponse(
             response=agent_response,
-            success=True
+            success=True,
+            cached=response.get("cached", False),
+            deadline_exceeded=response.get("deadline_exceeded", False),
+            partial=response.get("partial", False)
         )
         
+    except SessionBusyError:
+        raise HTTPException(
+            status_code=409,
+            detail="Bu oturumdaki önceki mesaj hâlâ işleniyor, lütfen biraz sonra tekrar deneyin"
+        )
     except Exception as e:
-        print(f"API Hatası: {str(e)}")
+        logger.exception("API Hatası: %s", e)
         raise HTTPException(
             status_code=500, 
             detail=f"Agent işlenirken hata oluştu: {str(e)}"
@@ -76,23 +135,34 @@ async def chat_with_agent(request: ChatRequest):
 
 @app.get("/api/v1/health")
 async def health_check():
-    """Sistem sağlık kontrolü"""
-    try:
-        # Sadece temel kontroller yap, agent'i tetikleme
-        return {
-            "status": "healthy",
-            "agent_status": "ready",
-            "available_tools": len(tools),
-            "server_status": "running"
-        }
-    except Exception as e:
-        return {
-            "status": "unhealthy",
-            "error": str(e)
-        }
+    """Sistem sağlık kontrolü (liveness) - süreç ayakta ise 200 döner, bileşen durumlarını raporlar"""
+    agent = startup.get("agent")
+    return {
+        "status": "healthy" if startup.ready else "starting",
+        "agent_status": startup.components["agent"].status,
+        "available_tools": len(agent.tools) if agent else 0,
+        "server_status": "running",
+        "components": {name: c.status for name, c in startup.components.items()},
+    }
+
+@app.get("/ready")
+async def readiness_check():
+    """Readiness - gerekli tüm bileşenler (READINESS_REQUIRED) hazırsa 200, değilse 503"""
+    content = {
+        "ready": startup.ready,
+        "components": {name: {"status": c.status, "required": c.required, "error": c.error}
+                       for name, c in startup.components.items()},
+    }
+    return JSONResponse(status_code=200 if startup.ready else 503, content=content)
+
+@app.get("/api/v1/startup")
+async def startup_report():
+    """Başlangıç süresi dökümü (import, bileşen bazında yükleme süreleri)"""
+    return startup.report()
 
 @app.post("/transcribe")
 async def transcribe_audio(audio_data: UploadFile = File(...)):
+    model = require_component("whisper")
     # Güvenli geçici dosya oluştur
     temp_dir = tempfile.gettempdir()
     temp_filename = os.path.join(temp_dir, f"temp_audio_{uuid.uuid4()}.webm")
@@ -110,16 +180,18 @@ async def transcribe_audio(audio_data: UploadFile = File(...)):
             raise FileNotFoundError(f"Geçici dosya oluşturulamadı: {temp_filename}")
         
         # Whisper ile transkript et
-        result = model.transcribe(temp_filename, fp16=False, language="tr")
+        with telemetry.span(telemetry.TRANSCRIBE_SECONDS, status="ok"):
+            # Transkripsiyon CPU/GPU yoğun; event loop'u bloklamamak için thread'de çalıştır
+            result = await asyncio.to_thread(model.transcribe, temp_filename, fp16=False, language="tr")
         transcribed_text = result['text']
         
         return {"text": transcribed_text.strip()}
         
     except FileNotFoundError as e:
-        print(f"Dosya bulunamadı hatası: {str(e)}")
+        logger.error("Dosya bulunamadı hatası: %s", e)
         return JSONResponse(status_code=500, content={"error": f"Dosya hatası: {str(e)}"})
     except Exception as e:
-        print(f"Transkripsiyon hatası: {str(e)}")
+        logger.exception("Transkripsiyon hatası: %s", e)
         return JSONResponse(status_code=500, content={"error": f"Transkripsiyon hatası: {str(e)}"})
     finally:
         # Temizlik
@@ -127,11 +199,18 @@ async def transcribe_audio(audio_data: UploadFile = File(...)):
             try:
                 os.remove(temp_filename)
             except Exception as cleanup_error:
-                print(f"Geçici dosya silinirken hata: {cleanup_error}")
+                logger.warning("Geçici dosya silinirken hata: %s", cleanup_error)
+
+@app.get("/metrics")
+async def metrics():
+    """Prometheus ölçümleri (LLM, araç, RAG ve Whisper süre histogramları)"""
+    body, content_type = telemetry.render_metrics()
+    return Response(content=body, media_type=content_type)
 
 @app.get("/api/v1/tools")
 async def get_available_tools():
     """Kullanılabilir araçları listele"""
+    tools = require_component("agent").tools
     tool_info = []
     for tool in tools:
         tool_info.append({
@@ -144,11 +223,16 @@ async def get_available_tools():
         "count": len(tools)
     }
 
+@app.get("/api/v1/cache/stats")
+async def answer_cache_stats():
+    """Yanıt önbelleği isabet oranı ve tahmini kazanılan süre"""
+    return require_component("agent").answer_cache.stats()
+
 @app.delete("/api/v1/sessions/{session_id}")
 async def clear_session_memory(session_id: str):
     """Belirli bir session'ın konuşmasını temizle"""
-    from main import clear_session_memory
-    if clear_session_memory(session_id):
+    agent = require_component("agent")
+    if await agent.clear_session_memory(session_id):
         return {"message": f"Session {session_id} konuşma geçmişi temizlendi"}
     else:
         raise HTTPException(status_code=404, detail="Session bulunamadı")
@@ -161,4 +245,6 @@ if __name__ == "__main__":
     print("🎤 Transcribe Endpoint: http://localhost:8081/transcribe")
     print("🧠 Memory: Sadece sohbet sırasındaki konuşmaları hatırlar")
     print("🗑️  Memory Temizleme: DELETE /api/v1/sessions/{id}")
+    print("📈 Ölçümler: http://localhost:8080/metrics")
+    print("✅ Hazır olma durumu: http://localhost:8080/ready")
     uvicorn.run(app, host="0.0.0.0", port=8080)
@@ -0,0 +1,679 @@
+"""
+llm_agent_test_scenarios_benchmark.xlsx senaryolarını chat_with_memory üzerinden tekrar oynatır.
+
+Varsayılan olarak yerel bir stub LLM (kural tabanlı araç seçimi + token başına
+gecikme modeli) ve süreç içinde çalışan mock backend (mock_backend.py) kullanılır;
+böylece main.py'deki bir değişikliğin agent döngüsünü hızlandırıp yavaşlattığı
+GPU ve backend olmadan ölçülebilir.
+
+Örnek:
+    python benchmark.py --concurrency 1,4,8
+    python benchmark.py --answer-cache on --repeat 3
+    python benchmark.py --agent-mode tools --baseline bench_results/<react>.json
+    python benchmark.py --llm live --backend live --concurrency 1
+    python benchmark.py --baseline bench_results/<önceki>.json
+
+Sonuçlar bench_results/ altına commit hash'i ile birlikte JSON olarak yazılır.
+"""
+import argparse
+import asyncio
+import collections
+import datetime
+import json
+import os
+import re
+import subprocess
+import time
+import typing
+import uuid
+import zlib
+
+import httpx
+import numpy as np
+from langchain_core.callbacks import AsyncCallbackHandler
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage, HumanMessage, SystemMessage, ToolMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+from langchain_core.utils.function_calling import convert_to_openai_tool
+from pydantic import PrivateAttr
+
+import config
+import mock_backend
+from answer_cache import AnswerCache
+from tool_selector import ToolSelector
+from telemetry import tool_schema_tokens
+from utils import PHONE_PATTERN, estimate_tokens, lower_tr, percentile
+
+SCENARIOS_PATH = os.path.join(config.BASE_DIR, "llm_agent_test_scenarios_benchmark.xlsx")
+RESULTS_DIR = os.path.join(config.BASE_DIR, "bench_results")
+
+# Müşteri bilgi isteyen araçlar turu bitirir, senaryo bir sonraki mesajla devam eder
+FOLLOW_UP_MESSAGES = {
+    "request_phone_number": "Numaram {phone}",
+    "request_user_info": "Adım Ahmet Yılmaz, numaram {phone}",
+}
+DEFAULT_PHONE = "05551234567"
+MAX_TURNS_PER_SCENARIO = 3
+
+NAME_PATTERN = re.compile(r"[Aa]d[ıi]m\s+([A-ZÇĞİÖŞÜ][a-zçğıöşü]+\s+[A-ZÇĞİÖŞÜ][a-zçğıöşü]+)")
+LOCATION_PATTERN = re.compile(r"[Ll]okasyon:\s*([^.,\n]+)")
+
+
+# ---- Senaryolar ----
+
+def _expected_tool_names(raw) -> typing.List[str]:
+    if not isinstance(raw, str) or not raw.strip():
+        return []
+    try:
+        return [step["name"] for step in json.loads(raw)]
+    except (ValueError, TypeError, KeyError):
+        # Bazı satırlardaki JSON elle yazılmış ve bozuk, isimleri regex ile al
+        return re.findall(r'"name"\s*:\s*"(\w+)"', raw)
+
+
+def _expected_first_tools(raw) -> typing.Set[str]:
+    if not isinstance(raw, str) or not raw.strip():
+        return set()
+    if " veya " in raw or " ya da " in raw:
+        return {part.strip() for part in re.split(r"\s+(?:veya|ya da)\s+", raw) if part.strip()}
+    return {raw.split()[0].strip(",")}
+
+
+def load_scenarios(path: str = SCENARIOS_PATH) -> typing.List[dict]:
+    import pandas as pd
+
+    frame = pd.read_excel(path)
+    scenarios = []
+    for row in frame.to_dict("records"):
+        if not isinstance(row.get("user_input"), str):
+            continue
+        scenarios.append({
+            "id": int(row["id"]),
+            "title": row.get("title"),
+            "user_input": row["user_input"].strip(),
+            "expected_first_tools": sorted(_expected_first_tools(row.get("expected_first_tool"))),
+            "expected_tools": _expected_tool_names(row.get("expected_tool_sequence_json")),
+        })
+    return scenarios
+
+
+# ---- Stub LLM ----
+
+def _find_phone(text: str) -> typing.Optional[str]:
+    match = PHONE_PATTERN.search(text or "")
+    return re.sub(r"[ -]", "", match.group()) if match else None
+
+
+def _has(text: str, *keywords: str) -> bool:
+    return any(keyword in text for keyword in keywords)
+
+
+def plan_tools(message: str,
+               phone: typing.Optional[str],
+               name: typing.Optional[str] = None) -> typing.Optional[typing.List[typing.Tuple[str, str]]]:
+    """
+    Gemma'nın araç seçimini taklit eden kural tabanlı plan.
+
+    Returns:
+        (araç adı, araç girdisi) listesi; boş liste doğrudan yanıt,
+        None ise mesajdan niyet çıkarılamadığı anlamına gelir.
+    """
+    text = lower_tr(message)
+
+    if _has(text, "hava", "oyun", "ekran", "kamera", "giderim", "ücretsiz", "indirim",
+            "arkadaşımın", "başkasının", "kurumsal", "kalitesiz"):
+        return []
+
+    if _has(text, "kayıt ol", "müşteri olmak", "müşterisi olmak", "yeni müşteri", "yeni bir hat"):
+        if name and phone:
+            plan = [("post_new_user", f"name={name}, phone={phone}")]
+            if "paket" in text:
+                plan.append(("get_all_package", ""))
+            return plan
+        return [("request_user_info", "")]
+
+    if _has(text, "arıza", "bölge", "lokasyon", "yavaş", "hızım"):
+        location = LOCATION_PATTERN.search(message)
+        return [("control_location_have_problem", location.group(1).strip() if location else "Konya")]
+
+    if _has(text, "nasıl işler", "avantaj", "iptal ücreti", "dondur", "aşım"):
+        return [("rag_search", message)]
+
+    if "paket" in text and not _has(text, "paketim", "hattımın"):
+        if "ev interneti" in text:
+            return [("get_packages_by_type", "ev interneti")]
+        if "mobil" in text:
+            return [("get_packages_by_type", "mobil")]
+        if _has(text, "tüm", "listele"):
+            return [("get_all_package", "")]
+
+    personal = None
+    if _has(text, "kayıtlı mıyım", "bilgimi güncelle", "iptal süreci"):
+        personal = "control_by_phonenumber"
+    elif "fatura" in text and _has(text, "detay", "içeriğ", "kalem", "pahalı", "ücret"):
+        personal = "get_active_invoice_items"
+    elif "fatura" in text and _has(text, "geçmiş", "ödenmemiş"):
+        personal = "get_user_invoices_by_usernumber"
+    elif "fatura" in text:
+        personal = "get_active_invoice_by_usernumber"
+    elif _has(text, "kalan", "yurt dışı", "bitmiş mi", "son kullanım"):
+        personal = "get_user_remainining_uses"
+    elif _has(text, "ek hizmet", "ek alım", "satın aldığım"):
+        personal = "get_service_purchase"
+    elif _has(text, "abonel", "taahhüt"):
+        personal = "get_current_subscription_by_usernumber"
+    elif "paket" in text:
+        personal = "get_package_by_usernumber"
+
+    if personal is None:
+        return None
+    if not phone:
+        return [("request_phone_number", "")]
+    plan = [(personal, phone)]
+    if _has(text, "öner", "uygun", "yükselt", "geçebilir"):
+        plan.append(("get_all_package", ""))
+    return plan
+
+
+def _section(text: str, tag: str) -> str:
+    # Kurallar metni etiket adlarını da andığı için son eşleşme asıl bölümdür
+    start = text.rfind(f"<{tag}>")
+    end = text.find(f"</{tag}>", start)
+    if start < 0 or end < 0:
+        return ""
+    return text[start + len(tag) + 2:end].strip()
+
+
+def _previous_user_messages(history: str) -> typing.List[str]:
+    return re.findall(r"HumanMessage\(content=['\"](.*?)['\"],", history)
+
+
+class StubChatModel(BaseChatModel):
+    """
+    Yerel LLM gecikmesini taklit eden sahte model.
+
+    Araç şemaları bağlanmamışsa ReAct formatında (Action/Action Input) metin, bağlanmışsa
+    (AGENT_MODE=tools) yapılandırılmış tool_calls üretir; bu modda plandaki tüm araçları
+    tek adımda ister.
+
+    Gecikme = prompt tokenları için prefill + üretilen token başına decode süresi.
+    Akış (astream) kullanıldığında metin kelime kelime, decode süresine yayılarak üretilir.
+    `slots` aynı anda işlenebilecek istek sayısıdır (tek GPU'lu LM Studio için 1).
+    """
+
+    prefill_ms_per_1k_tokens: float = 150.0
+    decode_ms_per_token: float = 15.0
+    slots: int = 1
+
+    _semaphore: typing.Optional[asyncio.Semaphore] = PrivateAttr(default=None)
+
+    @property
+    def _llm_type(self) -> str:
+        return "stub-react"
+
+    def bind_tools(self, tools, **kwargs):
+        return self.bind(tools=[convert_to_openai_tool(t) for t in tools], **kwargs)
+
+    @staticmethod
+    def _plan(message: str, previous_messages: typing.List[str], context: str,
+              offered: typing.Set[str]) -> typing.List[typing.Tuple[str, str]]:
+        phone = _find_phone(message) or _find_phone(context)
+        name_match = NAME_PATTERN.search(message) or NAME_PATTERN.search(context)
+        name = name_match.group(1) if name_match else None
+
+        plan = plan_tools(message, phone, name)
+        if plan is None:
+            # Mesaj tek başına niyet taşımıyorsa (örn. "Numaram ..."), önceki isteğe bak
+            for previous in reversed(previous_messages):
+                plan = plan_tools(previous, phone, name)
+                if plan is not None:
+                    break
+        # Prompt'ta sunulmayan araç seçilemez (araç seçimi açıkken)
+        if plan:
+            plan = [(tool_name, tool_input) for tool_name, tool_input in plan if tool_name in offered] or None
+        return plan if plan is not None else [("rag_search", message)]
+
+    def _respond(self, prompt: str) -> str:
+        message = _section(prompt, "musteri_sorusu")
+        history = _section(prompt, "konusma_gecmisi")
+        scratchpad = prompt.split("</yanit_formati>", 1)[-1]
+        offered = set(_section(prompt, "araclar").splitlines()[0].replace(" ", "").split(","))
+        plan = self._plan(message, _previous_user_messages(history), history, offered)
+
+        step = scratchpad.count("Observation:")
+        if step < len(plan):
+            tool_name, tool_input = plan[step]
+            return (f"Intent: {message[:60]}\n"
+                    f"Thought: Bu istek için {tool_name} aracını kullanmalıyım.\n"
+                    f"Action: {tool_name}\n"
+                    f"Action Input: {tool_input}")
+
+        observations = re.findall(r"Observation:\s*(.*?)(?:\nThought:|$)", scratchpad, re.S)
+        summary = observations[-1].strip()[:200] if observations else "Size nasıl yardımcı olabilirim?"
+        return f"Thought: Yanıtı biliyorum.\nFinal Answer: {summary}"
+
+    def _respond_tool_calls(self, messages: typing.List[BaseMessage], tools: typing.List[dict]) -> AIMessage:
+        last_human = max(i for i, m in enumerate(messages) if isinstance(m, HumanMessage))
+        message = str(messages[last_human].content)
+        history = messages[:last_human]
+        context = "\n".join(str(m.content) for m in history if not isinstance(m, SystemMessage))
+        previous = [str(m.content) for m in history if isinstance(m, HumanMessage)]
+
+        # Bu turda araç sonuçları geldiyse yanıtla; gelmediyse planın tamamını tek adımda iste
+        results = [str(m.content) for m in messages[last_human + 1:] if isinstance(m, ToolMessage)]
+        if results:
+            return AIMessage(content=results[-1].strip()[:200])
+
+        offered = {t["function"]["name"] for t in tools}
+        plan = [(tool_name, tool_input) for tool_name, tool_input in self._plan(message, previous, context, offered)
+                if tool_name != "final_answer"]
+        if not plan:
+            return AIMessage(content="Size nasıl yardımcı olabilirim?")
+        parameters = {t["function"]["name"]: list(t["function"]["parameters"].get("properties", {}))
+                      for t in tools}
+        return AIMessage(content="", tool_calls=[
+            {
+                "name": tool_name,
+                "args": {parameters[tool_name][0]: tool_input} if parameters.get(tool_name) else {},
+                "id": f"call_{uuid.uuid4().hex[:12]}",
+            }
+            for tool_name, tool_input in plan
+        ])
+
+    def _complete(self, messages: typing.List[BaseMessage], tools: typing.Optional[typing.List[dict]]):
+        if tools:
+            # Araç şemaları da prompt tokenı olarak işlenir
+            prompt = self._prompt_text(messages) + json.dumps(tools, ensure_ascii=False)
+            message = self._respond_tool_calls(messages, tools)
+            output = message.content or json.dumps(message.tool_calls, ensure_ascii=False)
+        else:
+            prompt = self._prompt_text(messages)
+            output = self._respond(prompt)
+            message = AIMessage(content=output)
+        return message, self._latency(prompt, output)
+
+    def _prompt_text(self, messages: typing.List[BaseMessage]) -> str:
+        return "\n".join(str(m.content) for m in messages)
+
+    def _latency(self, prompt: str, output: str) -> float:
+        return (estimate_tokens(prompt) / 1000 * self.prefill_ms_per_1k_tokens
+                + estimate_tokens(output) * self.decode_ms_per_token) / 1000
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        message, latency = self._complete(messages, kwargs.get("tools"))
+        time.sleep(latency)
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.slots)
+        message, latency = self._complete(messages, kwargs.get("tools"))
+        async with self._semaphore:
+            await asyncio.sleep(latency)
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    async def _astream(self, messages, stop=None, run_manager=None, **kwargs):
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.slots)
+        message, latency = self._complete(messages, kwargs.get("tools"))
+        async with self._semaphore:
+            if message.tool_calls:
+                await asyncio.sleep(latency)
+                yield ChatGenerationChunk(message=AIMessageChunk(content="", tool_call_chunks=[
+                    {"name": call["name"], "args": json.dumps(call["args"], ensure_ascii=False),
+                     "id": call["id"], "index": i}
+                    for i, call in enumerate(message.tool_calls)
+                ]))
+                return
+            words = re.findall(r"\S+\s*", message.content) or [""]
+            decode = sum(estimate_tokens(word) for word in words) * self.decode_ms_per_token / 1000
+            await asyncio.sleep(max(latency - decode, 0.0))
+            for word in words:
+                await asyncio.sleep(estimate_tokens(word) * self.decode_ms_per_token / 1000)
+                chunk = ChatGenerationChunk(message=AIMessageChunk(content=word))
+                if run_manager:
+                    await run_manager.on_llm_new_token(word, chunk=chunk)
+                yield chunk
+
+
+# ---- Stub backend ----
+
+def stub_backend_transport(latency_ms: float = 20.0, error_rate: float = 0.0) -> httpx.ASGITransport:
+    """Araç isteklerini ağ kullanmadan süreç içi mock backend uygulamasına yönlendirir."""
+    settings = mock_backend.MockSettings(latency_ms=latency_ms, jitter_ms=latency_ms / 2, error_rate=error_rate)
+    return httpx.ASGITransport(app=mock_backend.create_app(settings))
+
+
+def hashed_embedding(text: str, dim: int = 1024) -> np.ndarray:
+    """e5 yüklenemeyen ortamlar için karakter 3-gram'larından normalize edilmiş vektör."""
+    vector = np.zeros(dim, dtype="float32")
+    text = f"  {text.lower()}  "
+    for i in range(len(text) - 2):
+        vector[zlib.crc32(text[i:i + 3].encode("utf-8")) % dim] += 1.0
+    return vector / (np.linalg.norm(vector) or 1.0)
+
+
+class CountingEmbedder:
+    """Soru vektörü üretimlerini sayar; hash modunda e5 encode süresini de taklit eder."""
+
+    def __init__(self, embed: typing.Callable[[str], np.ndarray], delay_ms: float = 0.0):
+        self.embed = embed
+        self.delay_ms = delay_ms
+        self.calls = 0
+
+    def __call__(self, text: str) -> np.ndarray:
+        self.calls += 1
+        if self.delay_ms:
+            time.sleep(self.delay_ms / 1000)
+        return self.embed(text)
+
+
+# ---- Ölçüm ----
+
+class TurnMetrics(AsyncCallbackHandler):
+    """Bir tur boyunca LLM çağrılarını, prompt tokenlarını ve araç çağrılarını sayar."""
+
+    def __init__(self):
+        self.llm_calls = 0
+        self.prompt_tokens = 0
+        self.tools: typing.List[str] = []
+        self.parse_errors = 0
+
+    async def on_chat_model_start(self, serialized, messages, **kwargs):
+        self.llm_calls += 1
+        self.prompt_tokens += sum(estimate_tokens(str(m.content)) for batch in messages for m in batch)
+        self.prompt_tokens += tool_schema_tokens(kwargs.get("invocation_params"))
+
+    async def on_llm_start(self, serialized, prompts, **kwargs):
+        self.llm_calls += 1
+        self.prompt_tokens += sum(estimate_tokens(p) for p in prompts)
+
+    async def on_tool_start(self, serialized, input_str, **kwargs):
+        name = (serialized or {}).get("name") or kwargs.get("name") or "?"
+        if name.startswith("_"):
+            # AgentExecutor ayrıştırma hatalarını "_Exception" aracı olarak işler
+            self.parse_errors += 1
+        else:
+            self.tools.append(name)
+
+
+async def run_scenario(scenario: dict, chat_with_memory, run_tag: str) -> dict:
+    session_id = f"bench-{run_tag}-{scenario['id']}-{uuid.uuid4().hex[:8]}"
+    phone = _find_phone(scenario["user_input"]) or DEFAULT_PHONE
+    message = scenario["user_input"]
+    turns, tools = [], []
+
+    for _ in range(MAX_TURNS_PER_SCENARIO):
+        metrics = TurnMetrics()
+        start = time.perf_counter()
+        error = None
+        response = {}
+        try:
+            response = await chat_with_memory(message, session_id=session_id, callbacks=[metrics])
+        except Exception as e:
+            error = f"{type(e).__name__}: {e}"
+        turns.append({
+            "latency_ms": (time.perf_counter() - start) * 1000,
+            "llm_calls": metrics.llm_calls,
+            "tool_calls": len(metrics.tools),
+            "prompt_tokens": metrics.prompt_tokens,
+            "parse_errors": metrics.parse_errors,
+            "tools": metrics.tools,
+            "cached": bool(response.get("cached")),
+            "selected_tools": response.get("selected_tools"),
+            "deadline_exceeded": bool(response.get("deadline_exceeded")),
+            "partial": bool(response.get("partial")),
+            "deadline_components": response.get("deadline_components") or [],
+            "error": error,
+        })
+        tools.extend(metrics.tools)
+
+        follow_up = next((FOLLOW_UP_MESSAGES[t] for t in reversed(metrics.tools) if t in FOLLOW_UP_MESSAGES), None)
+        if error or response.get("deadline_exceeded") or not follow_up or metrics.tools[-1] not in FOLLOW_UP_MESSAGES:
+            break
+        message = follow_up.format(phone=phone)
+
+    first_tool = tools[0] if tools else "final_answer"
+    expected = [t for t in scenario["expected_tools"] if t != "final_answer"]
+    # Araç seçimi açıkken beklenen ama hiçbir turda prompt'a konmamış araçlar
+    offered = [set(turn["selected_tools"]) for turn in turns if turn["selected_tools"] is not None]
+    misses = [t for t in expected if not any(t in tool_set for tool_set in offered)] if offered else None
+    recall = sum(1 for t in expected if t in tools) / len(expected) if expected else 1.0
+    return {
+        "id": scenario["id"],
+        "first_tool": first_tool,
+        "first_tool_correct": first_tool in scenario["expected_first_tools"],
+        # Önbellekten yanıtlanan senaryolar araç doğruluğu ölçümüne katılmaz
+        "cached": turns[0]["cached"],
+        "tool_sequence_recall": recall,
+        "tools": tools,
+        "selection_misses": misses,
+        "selection_recall": 1 - len(misses) / len(expected) if misses is not None and expected else None,
+        "turns": turns,
+    }
+
+
+def summarize(results: typing.List[dict], wall_seconds: float) -> dict:
+    turns = [turn for result in results for turn in result["turns"]]
+    latencies = [turn["latency_ms"] for turn in turns]
+    scored = [r for r in results if not r.get("cached")]
+    selected = [len(turn["selected_tools"]) for turn in turns if turn["selected_tools"] is not None]
+    selection = [r["selection_recall"] for r in results if r["selection_recall"] is not None]
+    cached = [turn["latency_ms"] for turn in turns if turn["cached"]]
+    uncached = [turn["latency_ms"] for turn in turns if not turn["cached"]]
+
+    def mean(key):
+        return sum(turn[key] for turn in turns) / len(turns) if turns else 0.0
+
+    return {
+        "scenarios": len(results),
+        "turns": len(turns),
+        "errors": sum(1 for turn in turns if turn["error"]),
+        "wall_seconds": wall_seconds,
+        "throughput_turns_per_s": len(turns) / wall_seconds if wall_seconds else 0.0,
+        "latency_p50_ms": percentile(latencies, 50),
+        "latency_p95_ms": percentile(latencies, 95),
+        "latency_p99_ms": percentile(latencies, 99),
+        "llm_calls_per_turn": mean("llm_calls"),
+        "tool_calls_per_turn": mean("tool_calls"),
+        "prompt_tokens_per_turn": mean("prompt_tokens"),
+        "parse_errors_per_turn": mean("parse_errors"),
+        "first_tool_accuracy": sum(r["first_tool_correct"] for r in scored) / len(scored) if scored else 0.0,
+        "tool_sequence_recall": sum(r["tool_sequence_recall"] for r in scored) / len(scored) if scored else 0.0,
+        "selected_tools_per_turn": sum(selected) / len(selected) if selected else 0.0,
+        "tool_selection_recall": sum(selection) / len(selection) if selection else 0.0,
+        "cache_hit_ratio": len(cached) / len(turns) if turns else 0.0,
+        "cache_hit_p50_ms": percentile(cached, 50) if cached else 0.0,
+        "uncached_p50_ms": percentile(uncached, 50) if uncached else 0.0,
+        "deadline_exceeded_ratio": sum(turn["deadline_exceeded"] for turn in turns) / len(turns) if turns else 0.0,
+        "partial_answers": sum(turn["partial"] for turn in turns),
+    }
+
+
+async def run_level(scenarios: typing.List[dict], concurrency: int, repeat: int, chat_with_memory) -> dict:
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def bounded(scenario, round_no):
+        async with semaphore:
+            return await run_scenario(scenario, chat_with_memory, f"c{concurrency}r{round_no}")
+
+    start = time.perf_counter()
+    results = await asyncio.gather(*[
+        bounded(scenario, round_no) for round_no in range(repeat) for scenario in scenarios
+    ])
+    wall_seconds = time.perf_counter() - start
+    return {"summary": summarize(results, wall_seconds), "results": results}
+
+
+def _git_revision() -> dict:
+    def git(*args):
+        try:
+            return subprocess.run(["git", *args], cwd=config.BASE_DIR, capture_output=True,
+                                  text=True, timeout=10).stdout.strip()
+        except (OSError, subprocess.SubprocessError):
+            return ""
+    return {"commit": git("rev-parse", "--short", "HEAD"), "dirty": bool(git("status", "--porcelain", "--untracked-files=no"))}
+
+
+def print_summary(levels: dict, baseline: dict = None):
+    columns = [
+        ("latency_p50_ms", "p50 ms", ".0f"), ("latency_p95_ms", "p95 ms", ".0f"), ("latency_p99_ms", "p99 ms", ".0f"),
+        ("llm_calls_per_turn", "LLM/tur", ".2f"), ("tool_calls_per_turn", "araç/tur", ".2f"),
+        ("prompt_tokens_per_turn", "token/tur", ".0f"), ("first_tool_accuracy", "ilk araç", ".1%"),
+        ("tool_sequence_recall", "sıra recall", ".1%"), ("cache_hit_ratio", "önbellek", ".1%"),
+        ("throughput_turns_per_s", "tur/sn", ".2f"),
+    ]
+    print(f"{'eşzamanlılık':<14}" + "".join(f"{title:>13}" for _, title, _ in columns))
+    for level, data in levels.items():
+        summary = data["summary"]
+        print(f"{level:<14}" + "".join(f"{summary[key]:>13{fmt}}" for key, _, fmt in columns))
+        base = (baseline or {}).get("levels", {}).get(str(level))
+        if base:
+            cells = []
+            for key, _, fmt in columns:
+                if key not in base["summary"]:
+                    cells.append(f"{'-':>13}")
+                    continue
+                delta = summary[key] - base["summary"][key]
+                cells.append(f"{delta:>+13{fmt}}")
+            print(f"{'  Δ baseline':<14}" + "".join(cells))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Agent senaryo benchmark'ı")
+    parser.add_argument("--scenarios", default=SCENARIOS_PATH)
+    parser.add_argument("--concurrency", default="1,4", help="Virgülle ayrılmış eşzamanlılık seviyeleri")
+    parser.add_argument("--repeat", type=int, default=1, help="Her seviyede senaryoların kaç kez oynatılacağı")
+    parser.add_argument("--limit", type=int, default=0, help="Sadece ilk N senaryoyu çalıştır")
+    parser.add_argument("--llm", choices=["stub", "live"], default="stub")
+    parser.add_argument("--agent-mode", choices=["react", "tools"], default=None,
+                        help="Agent modu (varsayılan: AGENT_MODE ortam değişkeni)")
+    parser.add_argument("--llm-slots", type=int, default=1, help="Stub LLM'in aynı anda işleyebileceği istek sayısı")
+    parser.add_argument("--prefill-ms-per-1k", type=float, default=150.0)
+    parser.add_argument("--decode-ms-per-token", type=float, default=15.0)
+    parser.add_argument("--backend", choices=["stub", "live"], default="stub")
+    parser.add_argument("--backend-latency-ms", type=float, default=20.0)
+    parser.add_argument("--backend-error-rate", type=float, default=0.0)
+    parser.add_argument("--answer-cache", choices=["on", "off"], default="off",
+                        help="Anlamsal yanıt önbelleği (isabet için --repeat 2+ kullanın)")
+    parser.add_argument("--tool-selection", choices=["on", "off"], default=None,
+                        help="Tur başına araç seçimi (varsayılan: TOOL_SELECTION_ENABLED)")
+    parser.add_argument("--embedder", choices=["e5", "hash"], default="e5",
+                        help="Önbellek ve araç seçimi vektörleri: e5 modeli veya modelsiz karakter 3-gram "
+                             "(e5 yüklenemezse hash kullanılır)")
+    parser.add_argument("--hash-embed-ms", type=float, default=50.0,
+                        help="hash modunda soru başına eklenen, e5 encode süresini taklit eden gecikme")
+    parser.add_argument("--deadline", type=float, default=None,
+                        help="Tur süresi sınırı, saniye (varsayılan: TURN_DEADLINE_SECONDS, 0 kapatır)")
+    parser.add_argument("--output", default=None, help="Sonuç JSON dosyası (varsayılan: bench_results/<zaman>_<commit>.json)")
+    parser.add_argument("--baseline", default=None, help="Karşılaştırılacak önceki sonuç JSON dosyası")
+    args = parser.parse_args()
+
+    if args.agent_mode:
+        config.AGENT_MODE = args.agent_mode
+    import main as agent_main
+
+    if args.llm == "stub":
+        agent_main.configure_llm(StubChatModel(
+            prefill_ms_per_1k_tokens=args.prefill_ms_per_1k,
+            decode_ms_per_token=args.decode_ms_per_token,
+            slots=args.llm_slots,
+        ))
+    else:
+        # Agent modu import'tan sonra değişmiş olabilir
+        agent_main.configure_llm(agent_main.model)
+    if args.backend == "stub":
+        agent_main.backend_transport = stub_backend_transport(args.backend_latency_ms, args.backend_error_rate)
+
+    scenarios = load_scenarios(args.scenarios)
+    if args.limit:
+        scenarios = scenarios[:args.limit]
+    levels = [int(level) for level in args.concurrency.split(",") if level.strip()]
+
+    config.ANSWER_CACHE_ENABLED = args.answer_cache == "on"
+    if args.deadline is not None:
+        config.TURN_DEADLINE_SECONDS = args.deadline
+    if args.tool_selection:
+        config.TOOL_SELECTION_ENABLED = args.tool_selection == "on"
+    embedder = args.embedder
+    if embedder == "e5":
+        try:
+            import rag
+            rag.get_embedding_model()
+            # Önbellek ve araç seçimi e5'i rag.embed_query üzerinden çağırır
+            counter = rag.embed_query = CountingEmbedder(rag.embed_query)
+            embed = None
+        except Exception as e:
+            print(f"⚠️  e5 yüklenemedi ({type(e).__name__}: {e}), hash vektörleri kullanılıyor")
+            embedder = "hash"
+    if embedder == "hash":
+        embed = counter = CountingEmbedder(hashed_embedding, args.hash_embed_ms)
+    agent_main.tool_selector = ToolSelector(agent_main.tools, embed=embed)
+    if config.TOOL_SELECTION_ENABLED:
+        # Sunucuda olduğu gibi açıklama vektörleri başlangıçta hesaplanır
+        agent_main.tool_selector.prepare()
+
+    async def run_all():
+        results = {}
+        for level in levels:
+            # Her seviye boş bir önbellekle başlar
+            agent_main.answer_cache = AnswerCache(
+                fetch_catalog=agent_main.fetch_package_catalog,
+                embed=embed,
+            )
+            counter.calls = 0
+            results[str(level)] = await run_level(scenarios, level, args.repeat, agent_main.chat_with_memory)
+            summary = results[str(level)]["summary"]
+            summary["query_embeddings_per_turn"] = counter.calls / summary["turns"] if summary["turns"] else 0.0
+            if config.ANSWER_CACHE_ENABLED:
+                results[str(level)]["answer_cache"] = agent_main.answer_cache.stats()
+        return results
+
+    report = {
+        "created_at": datetime.datetime.now().isoformat(timespec="seconds"),
+        "git": _git_revision(),
+        "settings": {key: value for key, value in vars(args).items() if key not in ("output", "baseline")},
+        "config": {"rag_mode": config.RAG_MODE, "llm_model": config.LLM_MODEL, "agent_mode": config.AGENT_MODE,
+                   "tool_selection": config.TOOL_SELECTION_ENABLED, "embedder": embedder,
+                   "turn_deadline_seconds": config.TURN_DEADLINE_SECONDS},
+        "levels": asyncio.run(run_all()),
+    }
+
+    output = args.output
+    if output is None:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        stamp = datetime.datetime.now().strftime("%Y%m%d-%H%M%S")
+        output = os.path.join(RESULTS_DIR, f"{stamp}_{report['git']['commit'] or 'nogit'}.json")
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+
+    baseline = None
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+    print_summary(report["levels"], baseline)
+    for level, data in report["levels"].items():
+        misses = collections.Counter(t for r in data["results"] for t in (r["selection_misses"] or []))
+        if config.TOOL_SELECTION_ENABLED:
+            summary = data["summary"]
+            print(f"🧰 Araç seçimi (eşzamanlılık {level}): tur başına {summary['selected_tools_per_turn']:.1f}/"
+                  f"{len(agent_main.tools)} araç, beklenen araç kapsamı {summary['tool_selection_recall']:.1%}, "
+                  f"tur başına {summary['query_embeddings_per_turn']:.2f} soru vektörü ({embedder})"
+                  + (f", kaçırılanlar: {dict(misses)}" if misses else ""))
+        expired = [turn for r in data["results"] for turn in r["turns"] if turn["deadline_exceeded"]]
+        if expired:
+            components = collections.Counter(c for turn in expired for c in turn["deadline_components"])
+            print(f"⏱️  Tur süresi sınırı (eşzamanlılık {level}): {len(expired)} tur {config.TURN_DEADLINE_SECONDS:g} sn'yi "
+                  f"aştı, {data['summary']['partial_answers']} kısmi yanıt, bileşenler: {dict(components)}")
+        stats = data.get("answer_cache")
+        if stats:
+            summary = data["summary"]
+            print(f"🗄️  Önbellek (eşzamanlılık {level}): isabet {stats['hits']}/{stats['hits'] + stats['misses']} "
+                  f"uygun tur ({stats['hit_ratio']:.1%}), isabet p50 {summary['cache_hit_p50_ms']:.0f} ms, "
+                  f"önbelleksiz p50 {summary['uncached_p50_ms']:.0f} ms, "
+                  f"tahmini kazanç {stats['estimated_saved_seconds']:.1f} sn")
+    print(f"\n📄 Sonuçlar: {output}")
+
+
+if __name__ == "__main__":
+    main()
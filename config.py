@@ -0,0 +1,128 @@
+"""
+Çalışma zamanı ayarları.
+
+Tüm değerler ortam değişkenleri ile ezilebilir; varsayılanlar yerel geliştirme
+ortamına (LM Studio + localhost:8000 backend) göre seçilmiştir.
+"""
+import os
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def env_int(name: str, default: int) -> int:
+    value = os.getenv(name)
+    return int(value) if value not in (None, "") else default
+
+
+def env_float(name: str, default: float) -> float:
+    value = os.getenv(name)
+    return float(value) if value not in (None, "") else default
+
+
+def env_bool(name: str, default: bool) -> bool:
+    value = os.getenv(name)
+    if value in (None, ""):
+        return default
+    return value.strip().lower() in ("1", "true", "yes", "on", "evet")
+
+
+# ---- LLM ve backend ----
+LLM_BASE_URL = os.getenv("LLM_BASE_URL", "http://localhost:1234/v1")
+LLM_API_KEY = os.getenv("LLM_API_KEY", "lm-studio")
+LLM_MODEL = os.getenv("LLM_MODEL", "google/gemma-3-12b")
+
+BACKEND_URL = os.getenv("BACKEND_URL", "http://localhost:8000/api/v1")
+
+# react: metin tabanlı Intent/Thought/Action döngüsü (create_react_agent)
+# tools: OpenAI uyumlu yerel fonksiyon çağırma; bir adımda birden fazla araç istenebilir
+# ve bu araçlar eşzamanlı çalıştırılır
+AGENT_MODE = os.getenv("AGENT_MODE", "react")
+
+
+# ---- Araç seçimi ----
+# Her turda prompt'a yalnızca mesaja ve oturum durumuna en uygun araçlar konur
+TOOL_SELECTION_ENABLED = env_bool("TOOL_SELECTION_ENABLED", True)
+# Kurallarla seçilenlere ek olarak e5 benzerliğiyle eklenecek en fazla araç sayısı
+TOOL_SELECTION_TOP_K = env_int("TOOL_SELECTION_TOP_K", 3)
+
+
+# ---- Başlangıç ve readiness ----
+WHISPER_MODEL = os.getenv("WHISPER_MODEL", "small")
+# /ready'nin 200 dönmesi için hazır olması gereken bileşenler
+# (agent, whisper, retriever, llm, backend, sessions)
+READINESS_REQUIRED = [
+    name.strip() for name in os.getenv("READINESS_REQUIRED", "agent,whisper,llm,backend,sessions").split(",") if name.strip()
+]
+STARTUP_CHECK_TIMEOUT = env_float("STARTUP_CHECK_TIMEOUT", 3.0)
+# Başarısız başlangıç görevlerinin (örn. henüz açılmamış LLM) yeniden deneme aralığı
+STARTUP_RETRY_SECONDS = env_float("STARTUP_RETRY_SECONDS", 10.0)
+
+
+# ---- Oturum (konuşma geçmişi) deposu ----
+# memory: süreç içi (tek worker) | sqlite: dosya tabanlı (aynı makinedeki worker'lar)
+# redis: Redis protokolü (birden fazla makine)
+SESSION_STORE = os.getenv("SESSION_STORE", "memory")
+SESSION_SQLITE_PATH = os.getenv("SESSION_SQLITE_PATH", os.path.join(BASE_DIR, "sessions.db"))
+SESSION_REDIS_URL = os.getenv("SESSION_REDIS_URL", "redis://localhost:6379/0")
+# Son turdan bu kadar süre sonra oturum geçmişi silinir
+SESSION_TTL_SECONDS = env_int("SESSION_TTL_SECONDS", 24 * 3600)
+# Aynı oturumun turları sıraya girer; kilit kirası tur sürdükçe TTL/3 aralıklarla yenilenir,
+# çöken bir worker'ın kilidi en geç bu süre sonunda düşer
+SESSION_LOCK_TTL_SECONDS = env_float("SESSION_LOCK_TTL_SECONDS", 120.0)
+SESSION_LOCK_WAIT_SECONDS = env_float("SESSION_LOCK_WAIT_SECONDS", 60.0)
+
+
+# ---- Anlamsal yanıt önbelleği ----
+# Kişiye özel olmayan (katalog/SSS) sorularda benzer bir soruya daha önce verilmiş
+# yanıt, agent döngüsü çalıştırılmadan döndürülür
+ANSWER_CACHE_ENABLED = env_bool("ANSWER_CACHE_ENABLED", True)
+# e5 kosinüs benzerliği eşiği; düşürmek isabeti artırır ama yanlış yanıt riskini de
+ANSWER_CACHE_THRESHOLD = env_float("ANSWER_CACHE_THRESHOLD", 0.93)
+ANSWER_CACHE_MAX_ENTRIES = env_int("ANSWER_CACHE_MAX_ENTRIES", 1000)
+ANSWER_CACHE_TTL_SECONDS = env_int("ANSWER_CACHE_TTL_SECONDS", 6 * 3600)
+# Paket kataloğunun (GET /packages/) değişip değişmediği en fazla bu sıklıkla kontrol edilir
+ANSWER_CACHE_CATALOG_CHECK_SECONDS = env_float("ANSWER_CACHE_CATALOG_CHECK_SECONDS", 60.0)
+
+
+# ---- Tur süresi sınırı ----
+# Bir chat turunun (kilit bekleme, önbellek, araç seçimi, LLM ve araç çağrıları dahil) en uzun
+# süresi; dolduğunda kısmi yanıt veya özür mesajı döner. 0 sınırı kapatır
+TURN_DEADLINE_SECONDS = env_float("TURN_DEADLINE_SECONDS", 30.0)
+# İstekle gönderilen deadline_seconds bu değere indirilir
+TURN_DEADLINE_MAX_SECONDS = env_float("TURN_DEADLINE_MAX_SECONDS", 90.0)
+# Araçların backend isteklerinin varsayılan zaman aşımı; turun kalan süresi daha kısaysa o uygulanır
+BACKEND_TIMEOUT_SECONDS = env_float("BACKEND_TIMEOUT_SECONDS", 10.0)
+
+
+# ---- Loglama ----
+# Sıcak yoldaki debug logları varsayılan olarak kapalıdır
+LOG_LEVEL = os.getenv("LOG_LEVEL", "WARNING").upper()
+# AgentExecutor'ın her adımı konsola yazdırması (sadece geliştirme için)
+AGENT_VERBOSE = env_bool("AGENT_VERBOSE", False)
+
+
+# ---- RAG ----
+EMBED_MODEL_NAME = os.getenv("EMBED_MODEL_NAME", "intfloat/multilingual-e5-large")
+
+# Sohbet bazlı (eski) indeks ve veri dosyaları
+DIALOG_INDEX_PATH = os.getenv("DIALOG_INDEX_PATH", os.path.join(BASE_DIR, "e5.index"))
+DIALOGS_CSV_PATH = os.getenv("DIALOGS_CSV_PATH", os.path.join(BASE_DIR, "translated_dialogs.csv"))
+CONVERSATION_IDS_CSV_PATH = os.getenv("CONVERSATION_IDS_CSV_PATH", os.path.join(BASE_DIR, "conversation_ids.csv"))
+
+# Konuşma turu (ajan/müşteri değişim penceresi) bazlı indeks
+TURN_INDEX_PATH = os.getenv("TURN_INDEX_PATH", os.path.join(BASE_DIR, "e5_turns.index"))
+TURN_CHUNKS_CSV_PATH = os.getenv("TURN_CHUNKS_CSV_PATH", os.path.join(BASE_DIR, "turn_chunks.csv"))
+
+# "turn": sadece ilgili değişim pencerelerini döner, "dialog": tüm transkripti döner
+RAG_MODE = os.getenv("RAG_MODE", "turn")
+RAG_TOP_K = env_int("RAG_TOP_K", 3)
+# Dönen örneklerin toplam uzunluk sınırı (karakter). RAG_TOKEN_BUDGET verilirse
+# ikisinden küçük olanı uygulanır.
+RAG_CHAR_BUDGET = env_int("RAG_CHAR_BUDGET", 1200)
+RAG_TOKEN_BUDGET = env_int("RAG_TOKEN_BUDGET", 0)
+# Bir pencere kaç satır (konuşmacı mesajı) içerir ve kaç satır kayarak ilerler
+RAG_WINDOW_LINES = env_int("RAG_WINDOW_LINES", 4)
+RAG_WINDOW_STRIDE = env_int("RAG_WINDOW_STRIDE", 2)
+
+# Token tahmini için ortalama karakter/token oranı (Türkçe metin, Gemma tokenizer)
+CHARS_PER_TOKEN = env_float("CHARS_PER_TOKEN", 3.5)
@@ -0,0 +1,189 @@
+"""
+Chat turları için uçtan uca süre sınırı (deadline).
+
+Bir tur; oturum kilidi, yanıt önbelleği, araç seçimi, LLM çağrıları ve araçların backend
+istekleri toplandığında sınırsız uzayabiliyordu. chat_with_memory her tur için bir
+Deadline açar ve bu contextvar üzerinden tüm alt çağrılara görünür olur:
+
+- DeadlineTransport, backend ve LLM HTTP isteklerinin zaman aşımını kalan süreyle sınırlar.
+- Süre dolduğunda tur iptal edilir; TurnProgress'in topladığı akış tokenlarından
+  tamamlanmış cümleler varsa kısmi yanıt, yoksa FALLBACK_ANSWER döner.
+- Süre dolduğu anda çalışmakta olan bileşenler (llm, araç adları, answer_cache...)
+  agent_deadline_exceeded_total sayacına yazılır.
+"""
+import asyncio
+import contextlib
+import contextvars
+import logging
+import re
+import time
+import typing
+
+import httpx
+from langchain_core.callbacks import AsyncCallbackHandler
+
+import telemetry
+
+logger = logging.getLogger(__name__)
+
+FALLBACK_ANSWER = ("Üzgünüm, isteğinizi şu anda zamanında tamamlayamadım. "
+                   "Lütfen birkaç dakika sonra tekrar dener misiniz?")
+PARTIAL_NOTE = "(Yanıtın devamını zamanında hazırlayamadım; ayrıntı için lütfen tekrar sorun.)"
+
+
+class Deadline:
+    """Bir turun bitmesi gereken an ve süre dolduğunda çalışmakta olan bileşenler."""
+
+    def __init__(self, seconds: float):
+        self.seconds = seconds
+        self.expires_at = time.monotonic() + seconds
+        # chat_with_memory'nin o anki aşaması (answer_cache, tool_selection, agent)
+        self.stage = "session_lock"
+        # Kalan süreyle sınırlanan isteği zaman aşımına uğrayan bileşenler
+        self.expired_in: typing.Set[str] = set()
+
+    def remaining(self) -> float:
+        return max(self.expires_at - time.monotonic(), 0.0)
+
+    @property
+    def expired(self) -> bool:
+        return time.monotonic() >= self.expires_at
+
+
+_current: contextvars.ContextVar[typing.Optional[Deadline]] = contextvars.ContextVar("turn_deadline", default=None)
+
+
+def current() -> typing.Optional[Deadline]:
+    return _current.get()
+
+
+def remaining() -> typing.Optional[float]:
+    """Aktif turun kalan süresi (saniye); tur sınırı yoksa None."""
+    deadline = _current.get()
+    return deadline.remaining() if deadline else None
+
+
+@contextlib.contextmanager
+def scope(seconds: typing.Optional[float]):
+    """seconds > 0 ise blok boyunca geçerli bir Deadline açar ve onu, değilse None verir."""
+    deadline = Deadline(seconds) if seconds and seconds > 0 else None
+    token = _current.set(deadline)
+    try:
+        yield deadline
+    finally:
+        _current.reset(token)
+
+
+def enter(stage: str):
+    """Aktif turun aşamasını işaretler (süre dolduğunda hangi bileşende kalındığı için)."""
+    deadline = _current.get()
+    if deadline:
+        deadline.stage = stage
+
+
+def record(components: typing.Iterable[str]) -> typing.List[str]:
+    components = sorted(set(components))
+    for component in components:
+        telemetry.DEADLINE_EXCEEDED.labels(component=component).inc()
+    return components
+
+
+class DeadlineTransport(httpx.AsyncBaseTransport):
+    """İstek zaman aşımlarını (connect/read/write/pool) turun kalan süresiyle sınırlar."""
+
+    def __init__(self, component: str, transport: httpx.AsyncBaseTransport = None):
+        self.component = component
+        self._transport = transport or httpx.AsyncHTTPTransport()
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        deadline = _current.get()
+        if deadline is not None:
+            left = deadline.remaining()
+            if left <= 0:
+                deadline.expired_in.add(self.component)
+                raise httpx.PoolTimeout("Tur süresi doldu, istek gönderilmedi", request=request)
+            timeout = request.extensions.get("timeout") or {}
+            request.extensions["timeout"] = {
+                key: left if timeout.get(key) is None else min(timeout[key], left)
+                for key in ("connect", "read", "write", "pool")
+            }
+        try:
+            return await self._transport.handle_async_request(request)
+        except httpx.TimeoutException:
+            if deadline is not None and deadline.expired:
+                deadline.expired_in.add(self.component)
+            raise
+
+    async def aclose(self):
+        await self._transport.aclose()
+
+
+_FINAL_ANSWER_PATTERN = re.compile(
+    r"Final Answer:\s*(.*)|Action:\s*final_answer\s*\nAction Input:\s*(.*)", re.S)
+_SENTENCE_END = re.compile(r".*[.!?…](?=\s|$)", re.S)
+
+
+class TurnProgress(AsyncCallbackHandler):
+    """Turda çalışmakta olan LLM/araç çağrılarını ve LLM'in akış halindeki çıktısını izler."""
+
+    def __init__(self, react: bool = True):
+        # ReAct'te yanıt "Final Answer:" sonrasıdır, fonksiyon çağırmada metnin kendisidir
+        self.react = react
+        self._running: typing.Dict[typing.Any, str] = {}
+        self._streams: typing.Dict[typing.Any, typing.List[str]] = {}
+        # İptal edilen çağrılar (LangChain iptali de on_*_error ile bildirir)
+        self._cancelled: typing.Set[str] = set()
+
+    async def on_chat_model_start(self, serialized, messages, *, run_id, **kwargs):
+        self._running[run_id] = "llm"
+        self._streams[run_id] = []
+
+    async def on_llm_start(self, serialized, prompts, *, run_id, **kwargs):
+        self._running[run_id] = "llm"
+        self._streams[run_id] = []
+
+    async def on_llm_new_token(self, token, *, run_id, **kwargs):
+        if token and run_id in self._streams:
+            self._streams[run_id].append(token)
+
+    async def on_llm_end(self, response, *, run_id, **kwargs):
+        self._running.pop(run_id, None)
+        self._streams.pop(run_id, None)
+
+    async def on_llm_error(self, error, *, run_id, **kwargs):
+        self._finish(run_id, error)
+        # Yarıda kalan akış kısmi yanıt için saklanır
+        if not isinstance(error, asyncio.CancelledError):
+            self._streams.pop(run_id, None)
+
+    async def on_tool_start(self, serialized, input_str, *, run_id, **kwargs):
+        self._running[run_id] = (serialized or {}).get("name") or "tool"
+
+    async def on_tool_end(self, output, *, run_id, **kwargs):
+        self._running.pop(run_id, None)
+
+    async def on_tool_error(self, error, *, run_id, **kwargs):
+        self._finish(run_id, error)
+
+    def _finish(self, run_id, error: BaseException):
+        component = self._running.pop(run_id, None)
+        if component and isinstance(error, asyncio.CancelledError):
+            self._cancelled.add(component)
+
+    def running(self) -> typing.Set[str]:
+        """Çalışmakta olan veya iptal edilen bileşenler."""
+        return set(self._running.values()) | self._cancelled
+
+    def partial_answer(self) -> typing.Optional[str]:
+        """Yarıda kalan son LLM yanıtının tamamlanmış cümleleri; yoksa None."""
+        for tokens in reversed(list(self._streams.values())):
+            text = "".join(tokens)
+            if self.react:
+                match = _FINAL_ANSWER_PATTERN.search(text)
+                if not match:
+                    continue
+                text = match.group(1) if match.group(1) is not None else match.group(2)
+            match = _SENTENCE_END.match(text.strip())
+            if match and len(match.group(0)) >= 20:
+                return f"{match.group(0)}\n\n{PARTIAL_NOTE}"
+        return None
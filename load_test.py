@@ -0,0 +1,197 @@
+"""
+api_server.py için yük üreteci.
+
+Sanal kullanıcılar gerçekçi çok turlu oturumlar (selamlaşma, soru, telefon numarası,
+kapanış) oynatır; turların bir kısmı önce /transcribe ile ses olarak gönderilir.
+Sonunda uç nokta bazında throughput ve gecikme dağılımları raporlanır.
+
+Örnek (mock backend + api_server ayrı terminallerde çalışırken):
+    python mock_backend.py --port 8000
+    python api_server.py
+    python load_test.py --url http://localhost:8080 --users 10 --duration 60 --audio-ratio 0.2
+"""
+import argparse
+import asyncio
+import io
+import json
+import math
+import random
+import time
+import typing
+import uuid
+import wave
+
+import httpx
+
+import mock_backend
+from utils import percentile
+
+# {phone} oturum başında mock backend'de kayıtlı bir numara ile doldurulur
+SESSION_SCRIPTS = [
+    ["Merhaba", "Son faturamın bilgilerini öğrenmek istiyorum", "Numaram {phone}", "Teşekkürler, iyi günler"],
+    ["Kalan internet hakkımı öğrenmek istiyorum", "{phone}", "Bana uygun ek paket önerir misiniz?"],
+    ["Mobil paketlerinizi öğrenmek istiyorum", "En ucuzu hangisi?", "Teşekkür ederim"],
+    ["Evimde internet çok yavaş, bölgemde arıza mı var? Lokasyon: Kadıköy", "Ne zaman çözülür?"],
+    ["Merhaba, numaram {phone}. Kayıtlı mıyım?", "Mevcut paketimi öğrenebilir miyim?", "Aboneliğim ne zaman yenilenecek?"],
+    ["Faturam neden normalden daha pahalı gelmiş", "Numaram {phone}", "Geçen ay satın aldığım ek hizmetleri görmek istiyorum"],
+    ["Tüm mevcut paketlerinizi listeleyin.", "Ev interneti paketleriniz neler?"],
+    ["Hattımı taşımak istiyorum, süreç nasıl işler?", "Teşekkürler"],
+]
+
+
+def synthetic_wav(seconds: float = 3.0, sample_rate: int = 16000) -> bytes:
+    """Konuşmaya benzer genlik değişimli ton + gürültüden oluşan mono 16-bit WAV üretir."""
+    rng = random.Random(0)
+    frames = bytearray()
+    for i in range(int(seconds * sample_rate)):
+        t = i / sample_rate
+        envelope = 0.5 + 0.5 * math.sin(2 * math.pi * 3 * t)
+        sample = envelope * (0.4 * math.sin(2 * math.pi * 220 * t) + 0.2 * math.sin(2 * math.pi * 440 * t))
+        sample += rng.uniform(-0.05, 0.05)
+        frames += int(max(-1.0, min(1.0, sample)) * 32767).to_bytes(2, "little", signed=True)
+
+    buffer = io.BytesIO()
+    with wave.open(buffer, "wb") as wav:
+        wav.setnchannels(1)
+        wav.setsampwidth(2)
+        wav.setframerate(sample_rate)
+        wav.writeframes(bytes(frames))
+    return buffer.getvalue()
+
+
+class Recorder:
+    """Uç nokta bazında gecikme ve durum kodlarını toplar."""
+
+    def __init__(self):
+        self.latencies: typing.Dict[str, typing.List[float]] = {}
+        self.statuses: typing.Dict[str, typing.Dict[str, int]] = {}
+        self.sessions_completed = 0
+
+    def record(self, endpoint: str, latency_ms: float, status: str):
+        self.latencies.setdefault(endpoint, []).append(latency_ms)
+        counts = self.statuses.setdefault(endpoint, {})
+        counts[status] = counts.get(status, 0) + 1
+
+    async def call(self, endpoint: str, request: typing.Awaitable[httpx.Response]) -> typing.Optional[httpx.Response]:
+        start = time.perf_counter()
+        try:
+            response = await request
+            status = str(response.status_code)
+        except httpx.TimeoutException:
+            response, status = None, "timeout"
+        except httpx.HTTPError as e:
+            response, status = None, type(e).__name__
+        self.record(endpoint, (time.perf_counter() - start) * 1000, status)
+        return response
+
+    def report(self, elapsed: float) -> dict:
+        endpoints = {}
+        for endpoint, values in self.latencies.items():
+            statuses = self.statuses[endpoint]
+            ok = sum(count for status, count in statuses.items() if status.startswith("2"))
+            endpoints[endpoint] = {
+                "requests": len(values),
+                "throughput_rps": len(values) / elapsed,
+                "success_rate": ok / len(values),
+                "statuses": statuses,
+                "p50_ms": percentile(values, 50),
+                "p90_ms": percentile(values, 90),
+                "p95_ms": percentile(values, 95),
+                "p99_ms": percentile(values, 99),
+                "max_ms": max(values),
+            }
+        total = sum(len(values) for values in self.latencies.values())
+        return {
+            "elapsed_seconds": elapsed,
+            "sessions_completed": self.sessions_completed,
+            "total_requests": total,
+            "throughput_rps": total / elapsed,
+            "endpoints": endpoints,
+        }
+
+
+async def run_session(client: httpx.AsyncClient, recorder: Recorder, rng: random.Random,
+                      phones: typing.List[str], audio: bytes, args):
+    session_id = f"load-{uuid.uuid4().hex[:12]}"
+    phone = rng.choice(phones)
+    for message in rng.choice(SESSION_SCRIPTS):
+        if rng.random() < args.audio_ratio:
+            # Ön yüz önce sesi yazıya çevirir, sonra metni chat'e gönderir
+            await recorder.call("/transcribe", client.post(
+                "/transcribe", files={"audio_data": ("kayit.wav", audio, "audio/wav")}))
+        await recorder.call("/api/v1/chat", client.post(
+            "/api/v1/chat", json={"message": message.format(phone=phone), "session_id": session_id}))
+        if args.think_ms:
+            await asyncio.sleep(rng.expovariate(1000 / args.think_ms))
+    await recorder.call("/api/v1/sessions", client.delete(f"/api/v1/sessions/{session_id}"))
+    recorder.sessions_completed += 1
+
+
+async def run(args) -> dict:
+    recorder = Recorder()
+    audio = open(args.audio_file, "rb").read() if args.audio_file else synthetic_wav(args.audio_seconds)
+    phones = list(mock_backend.generate_data(args.seed, args.mock_users)["users"])
+    deadline = time.perf_counter() + args.duration
+    remaining_sessions = [args.sessions] if args.sessions else None
+
+    async def virtual_user(user_no: int, client: httpx.AsyncClient):
+        rng = random.Random(args.seed + user_no)
+        # Kullanıcıların aynı anda başlamaması için rampa
+        await asyncio.sleep(args.ramp_up * user_no / max(args.users, 1))
+        while time.perf_counter() < deadline:
+            if remaining_sessions is not None:
+                if remaining_sessions[0] <= 0:
+                    return
+                remaining_sessions[0] -= 1
+            await run_session(client, recorder, rng, phones, audio, args)
+
+    limits = httpx.Limits(max_connections=args.users * 2, max_keepalive_connections=args.users)
+    async with httpx.AsyncClient(base_url=args.url, timeout=args.timeout, limits=limits) as client:
+        start = time.perf_counter()
+        await asyncio.gather(*[virtual_user(i, client) for i in range(args.users)])
+        elapsed = time.perf_counter() - start
+    return recorder.report(elapsed)
+
+
+def print_report(report: dict):
+    print(f"\n⏱️  Süre: {report['elapsed_seconds']:.1f} sn | Oturum: {report['sessions_completed']} | "
+          f"İstek: {report['total_requests']} | Toplam throughput: {report['throughput_rps']:.2f} istek/sn\n")
+    print(f"{'uç nokta':<20}{'istek':>8}{'istek/sn':>10}{'başarı':>9}{'p50 ms':>10}{'p90 ms':>10}"
+          f"{'p95 ms':>10}{'p99 ms':>10}{'maks ms':>10}")
+    for endpoint, row in report["endpoints"].items():
+        print(f"{endpoint:<20}{row['requests']:>8}{row['throughput_rps']:>10.2f}{row['success_rate']:>9.1%}"
+              f"{row['p50_ms']:>10.0f}{row['p90_ms']:>10.0f}{row['p95_ms']:>10.0f}{row['p99_ms']:>10.0f}"
+              f"{row['max_ms']:>10.0f}")
+        failures = {status: count for status, count in row["statuses"].items() if not status.startswith("2")}
+        if failures:
+            print(f"{'':<20}hatalar: {failures}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="api_server yük testi")
+    parser.add_argument("--url", default="http://localhost:8080")
+    parser.add_argument("--users", type=int, default=10, help="Eşzamanlı sanal kullanıcı sayısı")
+    parser.add_argument("--duration", type=float, default=60.0, help="Test süresi (sn)")
+    parser.add_argument("--sessions", type=int, default=0, help="Toplam oturum sınırı (0: süre boyunca)")
+    parser.add_argument("--ramp-up", type=float, default=5.0, help="Tüm kullanıcıların başlaması için geçen süre (sn)")
+    parser.add_argument("--think-ms", type=float, default=1000.0, help="Turlar arası ortalama bekleme")
+    parser.add_argument("--audio-ratio", type=float, default=0.2, help="Ses olarak gönderilen tur oranı")
+    parser.add_argument("--audio-file", default=None, help="Sentetik ses yerine kullanılacak kayıt")
+    parser.add_argument("--audio-seconds", type=float, default=3.0)
+    parser.add_argument("--timeout", type=float, default=120.0)
+    parser.add_argument("--seed", type=int, default=42, help="Mock backend ile aynı tohum")
+    parser.add_argument("--mock-users", type=int, default=1000)
+    parser.add_argument("--output", default=None, help="Sonuçların yazılacağı JSON dosyası")
+    args = parser.parse_args()
+
+    report = asyncio.run(run(args))
+    report["settings"] = vars(args)
+    print_report(report)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"\n📄 Sonuçlar: {args.output}")
+
+
+if __name__ == "__main__":
+    main()
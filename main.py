@@ -1,22 +1,24 @@
 import typing
-from langchain.agents import create_react_agent, AgentExecutor
-from langchain_core.prompts import PromptTemplate
+from langchain.agents import create_react_agent, create_tool_calling_agent, AgentExecutor
+from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder, PromptTemplate
 from langchain_core.tools import tool
 from langchain.memory import ConversationBufferMemory
-from langchain_community.embeddings import HuggingFaceEmbeddings
 # from langchain_core.messages import HumanMessage, AIMessage
 from langchain_openai import ChatOpenAI
 from langsmith import traceable
-from langchain_core.documents import Document
-from langchain.chains import RetrievalQA
 import httpx
 import asyncio
 from langchain.tools import Tool
-from langchain_community.vectorstores import FAISS
-import pandas as pd
-import pickle
-import typing
 import re
+import logging
+import rag
+import config
+import session_store
+import time
+from answer_cache import AnswerCache, ToolRecorder, is_cacheable
+from tool_selector import ToolSelector
+import deadline
+import telemetry
 
 final_answer = Tool(
     name="final_answer",
@@ -25,6 +27,16 @@ final_answer = Tool(
     return_direct=True
 )
 
+logger = logging.getLogger(__name__)
+
+# Benchmark ve testlerde gerçek backend yerine kullanılacak httpx transport'u
+backend_transport = None
+
+def api_client(tool_name: str) -> httpx.AsyncClient:
+    """Backend API istekleri için araç adıyla ölçümlenen, zaman aşımı turun kalan süresiyle sınırlı HTTP istemcisi oluşturur"""
+    transport = deadline.DeadlineTransport(tool_name, telemetry.InstrumentedTransport(tool_name, backend_transport))
+    return httpx.AsyncClient(timeout=config.BACKEND_TIMEOUT_SECONDS, transport=transport)
+
 def is_valid_number(phonenumber: str) -> bool:
     if not phonenumber or len(phonenumber.replace(" ", "").replace("-", "")) < 10:
         return False
@@ -48,11 +60,10 @@ async def control_by_phonenumber(phoneNumber: str) -> str:
     if not is_valid_number(phoneNumber):
         return "Geçersiz telefon numarası. Lütfen 11 haneli telefon numaranızı doğru formatta girin."
     try:
-         async with httpx.AsyncClient() as client:
+         async with api_client("control_by_phonenumber") as client:
              phoneNumber = phoneNumber.strip()
-             url = f"http://localhost:8000/api/v1/users/phone/{phoneNumber}"
-             print("////////////////////////////////////")
-             print(url)
+             url = f"{config.BACKEND_URL}/users/phone/{phoneNumber}"
+             logger.debug("Backend isteği: %s", url)
              response = await client.get(url)
              response.raise_for_status()
              return response.text
@@ -81,8 +92,8 @@ async def control_location_have_problem(location: str) -> str:
     önce bölgesel arızaları kontrol etmek için kullanın.
     """
     try:
-         async with httpx.AsyncClient() as client:
-             url = f"http://localhost:8000/api/v1/problems/location/{location}"
+         async with api_client("control_location_have_problem") as client:
+             url = f"{config.BACKEND_URL}/problems/location/{location}"
              response = await client.get(url)
              response.raise_for_status()
              return response.text
@@ -114,10 +125,9 @@ async def get_packages_by_type(package_type: str) ->str:
         return f"Geçersiz paket türü: '{package_type}'. Lütfen 'mobil', 'ev' veya 'ekstra' türlerinden birini belirtin."
     
     try:
-         async with httpx.AsyncClient() as client:
-             url = f"http://localhost:8000/api/v1/packages/{package_type.lower()}"
-             print("///////////////////////////////////")
-             print(url)
+         async with api_client("get_packages_by_type") as client:
+             url = f"{config.BACKEND_URL}/packages/{package_type.lower()}"
+             logger.debug("Backend isteği: %s", url)
              response = await client.get(url)
              response.raise_for_status()
              return response.text
@@ -145,9 +155,9 @@ async def request_user_info(phoneNumber: str = None, **kwargs) -> str:
     if not is_valid_number(phoneNumber):
         return "Geçersiz telefon numarası. Lütfen 11 haneli telefon numaranızı doğru formatta girin."
     try:
-        async with httpx.AsyncClient() as client:
+        async with api_client("request_user_info") as client:
             phoneNumber = phoneNumber.strip()
-            url = f"http://localhost:8000/api/v1/users/phone/{phoneNumber}"
+            url = f"{config.BACKEND_URL}/users/phone/{phoneNumber}"
             response = await client.get(url)
             response.raise_for_status()
             return response.text
@@ -195,9 +205,9 @@ async def post_new_user(input: typing.Union[dict, str]) -> str:
 
     # 4️⃣ API'ye kayıt denemesi
     try:
-        async with httpx.AsyncClient() as client:
+        async with api_client("post_new_user") as client:
             user_data = {"name": name, "phone": phone_clean}
-            response = await client.post("http://localhost:8000/api/v1/users/", json=user_data)
+            response = await client.post(f"{config.BACKEND_URL}/users/", json=user_data)
             response.raise_for_status()
             return (
                 f"✅ Kullanıcı hesabınız başarıyla oluşturuldu!\n\n"
@@ -227,8 +237,8 @@ async def get_all_package() -> str:
     dediğinde kullanın. Hem mobil hem ev interneti paketlerini kapsar.
     """
     try:
-        async with httpx.AsyncClient() as client:
-            response = await client.get("http://localhost:8000/api/v1/packages/")
+        async with api_client("get_all_package") as client:
+            response = await client.get(f"{config.BACKEND_URL}/packages/")
             response.raise_for_status()
             return response.text
     except httpx.HTTPStatusError as e:
@@ -287,11 +297,10 @@ async def get_package_by_usernumber(phonenumber: str) -> str:
     if not is_valid_number(phonenumber):
         return "Geçersiz telefon numarası. Lütfen 11 haneli telefon numaranızı doğru formatta girin."
     try:
-        async with httpx.AsyncClient() as client:
+        async with api_client("get_package_by_usernumber") as client:
             phonenumber = phonenumber.strip()
-            url = f"http://localhost:8000/api/v1/users/phone/{phonenumber}/package"
-            print("/////////////////////////////////////")
-            print(phonenumber)
+            url = f"{config.BACKEND_URL}/users/phone/{phonenumber}/package"
+            logger.debug("Backend isteği: %s", url)
             response = await client.get(url)
             response.raise_for_status()
             return response.text
@@ -321,11 +330,10 @@ async def get_current_subscription_by_usernumber(phonenumber: str) -> str:
     if not is_valid_number(phonenumber):
         return "Geçersiz telefon numarası. Lütfen 11 haneli telefon numaranızı doğru formatta girin."
     try:
-        async with httpx.AsyncClient() as client:
+        async with api_client("get_current_subscription_by_usernumber") as client:
             phonenumber = phonenumber.strip()
-            url = f"http://localhost:8000/api/v1/subs/{phonenumber}/activesub"
-            print("/////////////////////////////////////")
-            print(phonenumber)
+            url = f"{config.BACKEND_URL}/subs/{phonenumber}/activesub"
+            logger.debug("Backend isteği: %s", url)
             response = await client.get(url)
             response.raise_for_status()
             return response.text
@@ -353,9 +361,9 @@ async def get_active_invoice_by_usernumber(phonenumber: str) -> str:
     if not is_valid_number(phonenumber):
         return "Geçersiz telefon numarası. Lütfen 11 haneli telefon numaranızı doğru formatta girin."
     try:
-        async with httpx.AsyncClient() as client:
+        async with api_client("get_active_invoice_by_usernumber") as client:
             phonenumber = phonenumber.strip()
-            url = f"http://localhost:8000/api/v1/invoices/phone/{phonenumber}/activeinvoice"
+            url = f"{config.BACKEND_URL}/invoices/phone/{phonenumber}/activeinvoice"
             response = await client.get(url)
             response.raise_for_status()
             return response.text
@@ -383,9 +391,9 @@ async def get_user_invoices_by_usernumber(phonenumber: str) -> str:
     if not is_valid_number(phonenumber):
         return "Geçersiz telefon numarası. Lütfen 11 haneli telefon numaranızı doğru formatta girin."
     try:
-        async with httpx.AsyncClient() as client:
+        async with api_client("get_user_invoices_by_usernumber") as client:
             phonenumber = phonenumber.strip()
-            url = f"http://localhost:8000/api/v1/invoices/phone/{phonenumber}/invoices"
+            url = f"{config.BACKEND_URL}/invoices/phone/{phonenumber}/invoices"
             response = await client.get(url)
             response.raise_for_status()
             return response.text
@@ -413,9 +421,9 @@ async def get_active_invoice_items(phonenumber: str) -> str:
     if not is_valid_number(phonenumber):
         return "Geçersiz telefon numarası. Lütfen 11 haneli telefon numaranızı doğru formatta girin."
     try:
-        async with httpx.AsyncClient() as client:
+        async with api_client("get_active_invoice_items") as client:
             phonenumber = phonenumber.strip()
-            url = f"http://localhost:8000/api/v1/invoices/phone/{phonenumber}/activeinvoice/items"
+            url = f"{config.BACKEND_URL}/invoices/phone/{phonenumber}/activeinvoice/items"
             response = await client.get(url)
             response.raise_for_status()
             return response.text
@@ -443,9 +451,9 @@ async def get_user_remainining_uses(phonenumber: str) -> str:
     if not is_valid_number(phonenumber):
         return "Geçersiz telefon numarası. Lütfen 11 haneli telefon numaranızı doğru formatta girin."
     try:
-        async with httpx.AsyncClient() as client:
+        async with api_client("get_user_remainining_uses") as client:
             phonenumber = phonenumber.strip()
-            url = f"http://localhost:8000/api/v1/remaining-uses/phone/{phonenumber}"
+            url = f"{config.BACKEND_URL}/remaining-uses/phone/{phonenumber}"
             response = await client.get(url)
             response.raise_for_status()
             return response.text
@@ -473,11 +481,10 @@ async def get_service_purchase(phonenumber: str) -> str:
     if not is_valid_number(phonenumber):
         return "Geçersiz telefon numarası. Lütfen 11 haneli telefon numaranızı doğru formatta girin."
     try:
-        async with httpx.AsyncClient() as client:
+        async with api_client("get_service_purchase") as client:
             phonenumber = phonenumber.strip()
-            url = f"http://localhost:8000/api/v1/service-purchases/phone/{phonenumber}"
-            print("///////////////////////////////////////////////////////////")
-            print(url)
+            url = f"{config.BACKEND_URL}/service-purchases/phone/{phonenumber}"
+            logger.debug("Backend isteği: %s", url)
             response = await client.get(url)
             response.raise_for_status()
             return response.text
@@ -502,9 +509,9 @@ async def get_package_by_name(name: str) -> str:
     Kullanım: Müşteri belirli bir paket hakkında detaylı bilgi almak istediğinde kullanın.
     """
     try:
-        async with httpx.AsyncClient() as client:
+        async with api_client("get_package_by_name") as client:
             name = name.strip()
-            url = f"http://localhost:8000/api/v1/packages/{name}"
+            url = f"{config.BACKEND_URL}/packages/{name}"
             response = await client.get(url)
             response.raise_for_status()
             return response.text
@@ -516,7 +523,7 @@ async def get_package_by_name(name: str) -> str:
         return f"Sistem hatası: Paket bilgileri alınamadı - {type(e).__name__}"
 
 @tool
-def rag_search(query: str) -> str:
+async def rag_search(query: str) -> str:
     """
     Müşteri sorgusuna benzer geçmiş sohbet örneklerini bularak agent'a rehberlik sağlar.
     
@@ -530,58 +537,8 @@ def rag_search(query: str) -> str:
     yararlanarak daha doğal ve uygun yanıtlar oluşturmak için kullanın.
     """
     try:
-        import faiss
-        import pandas as pd
-        from sentence_transformers import SentenceTransformer
-        
-        # ---- 1. Embed modeli ----
-        model = SentenceTransformer('intfloat/multilingual-e5-large')
-
-        # ---- 2. FAISS index yükleme ----
-        index = faiss.read_index("e5.index")
-
-        # ---- 3. Veri ve conversation ID'leri ----
-        data = pd.read_csv("translated_dialogs.csv", encoding="utf-8")
-        conv_ids = pd.read_csv("conversation_ids.csv", encoding="utf-8")
-
-        # ---- 4. Retriever fonksiyonu ----
-        def retrieve(search_query, top_k=2):
-            # Sorguyu embedle
-            query_vec = model.encode([search_query])
-            query_vec = query_vec.astype("float32")
-
-            # FAISS ile arama yap
-            distances, indices = index.search(query_vec, top_k)
-
-            results = []
-            for idx in indices[0]:
-                if idx < len(conv_ids):
-                    text_id = conv_ids.iloc[idx]['conversation_id']
-                    filtered = data[data['conversation_id'] == text_id]
-                    if not filtered.empty:
-                        text_row = filtered['translated_tr'].values[0]
-                        results.append(text_row)
-            return results
-
-        # ---- 5. Benzer sohbetleri bul ----
-        similar_conversations = retrieve(query)
-        
-        if not similar_conversations:
-            return "Bu sorgu için benzer sohbet örneği bulunamadı."
-        
-        # ---- 6. Sonuçları formatla ----
-        response = f"📚 **Benzer Sohbet Örnekleri** ('{query}' için):\n\n"
-        
-        for i, conversation in enumerate(similar_conversations, 1):
-            response += f"**Örnek {i}:**\n{conversation}\n\n"
-        
-        response += "💡 **Öneriler:**\n"
-        response += "- Bu örnekleri baz alarak müşteriye samimi ve yardımcı bir ton kullan\n"
-        response += "- Benzer durumlardan öğrenilen çözüm yöntemlerini uygula\n"
-        response += "- Müşterinin ihtiyacına göre bu örneklerdeki yaklaşımı adapte et\n"
-        
-        return response
-        
+        # Thread'de çalışır; tur süresi dolarsa beklemesi iptal edilir
+        return await asyncio.to_thread(rag.retrieve, query)
     except FileNotFoundError as e:
         return f"RAG dosyaları bulunamadı: {str(e)}. Lütfen 'e5.index', 'translated_dialogs.csv' ve 'conversation_ids.csv' dosyalarının mevcut olduğundan emin olun."
     except Exception as e:
@@ -591,34 +548,36 @@ def rag_search(query: str) -> str:
 tools = [final_answer,get_all_package, get_package_by_name,get_package_by_usernumber, request_user_info,request_new_user_info_tool, post_new_user, get_packages_by_type, control_by_phonenumber, control_location_have_problem, get_user_remainining_uses, get_service_purchase, get_active_invoice_items,get_active_invoice_by_usernumber,get_current_subscription_by_usernumber, get_user_invoices_by_usernumber,request_phone_number_tool, rag_search]  
 # tools = [rag_search,final_answer]
 
-model = model = ChatOpenAI(
-    base_url="http://localhost:1234/v1",  
-    api_key="lm-studio",                 
-    model="google/gemma-3-12b",
+model = ChatOpenAI(
+    base_url=config.LLM_BASE_URL,
+    api_key=config.LLM_API_KEY,
+    model=config.LLM_MODEL,
     temperature=0.0,
-    streaming=True
+    streaming=True,
+    # LLM isteklerinin zaman aşımı da turun kalan süresiyle sınırlanır
+    http_async_client=httpx.AsyncClient(transport=deadline.DeadlineTransport("llm"))
 )
 
 # Basit sohbet memory - sadece o anki konuşmayı hatırlar
-session_memories = {}
-
-def get_or_create_memory(session_id: str = "default") -> ConversationBufferMemory:
-    """Session ID'ye göre memory objesi döndürür veya yenisini oluşturur"""
-    if session_id not in session_memories:
-        session_memories[session_id] = ConversationBufferMemory(
-            memory_key="chat_history",
-            return_messages=True,
-            output_key="output",
-            max_token_limit=800  # 4096 token limit için çok düşük tut
-        )
-    return session_memories[session_id]
-
-def clear_session_memory(session_id: str):
+def new_memory(messages: list = None) -> ConversationBufferMemory:
+    """Verilen geçmiş mesajlarla turluk bir memory objesi oluşturur"""
+    memory = ConversationBufferMemory(
+        memory_key="chat_history",
+        return_messages=True,
+        output_key="output",
+        max_token_limit=800  # 4096 token limit için çok düşük tut
+    )
+    if messages:
+        memory.chat_memory.add_messages(messages)
+    return memory
+
+async def get_or_create_memory(session_id: str = "default") -> ConversationBufferMemory:
+    """Session ID'nin geçmişini oturum deposundan (SESSION_STORE) yükler"""
+    return new_memory(await session_store.get_store().load(session_id))
+
+async def clear_session_memory(session_id: str):
     """Belirli bir session'ın konuşmasını temizle"""
-    if session_id in session_memories:
-        session_memories[session_id].clear()
-        return True
-    return False
+    return await session_store.get_store().delete(session_id)
 
 prompt = PromptTemplate.from_template("""
 Sen, bir telekomünikasyon şirketinde uzman ve dost canlısı bir müşteri temsilcisisin. 🎧
@@ -658,29 +617,159 @@ Action Input: parametre
 """
 )
 
+# Yerel fonksiyon çağırma (AGENT_MODE=tools) için prompt; araç şemaları modele ayrıca iletilir
+tool_calling_prompt = ChatPromptTemplate.from_messages([
+    ("system", """Sen, bir telekomünikasyon şirketinde uzman ve dost canlısı bir müşteri temsilcisisin. 🎧
+Görevin, araçları kullanarak müşterilere hızlı ve doğru çözümler sunmaktır.
+
+Kurallar:
+1. Önce müşterinin isteğini anla. Gerekli tüm bilgiye (örn. telefon numarası) sahip misin?
+2. Bir aracı kullanmadan önce ihtiyacın olan bilginin (isim, telefon numarası vb.) konuşma geçmişinde olup olmadığını kontrol et. Bilgi oradaysa tekrar isteme.
+3. Müşterinin isteğine en uygun aracı seç. Uygun bir araç bulamazsan son çare olarak rag_search aracını kullan.
+4. Birbirinden bağımsız birden fazla bilgiye ihtiyacın varsa (örn. aktif fatura ve kalan kullanım hakları) ilgili araçları aynı adımda birlikte çağır; sonuçlarını bekleyip tek seferde yanıt ver.
+5. Müşterinin sorusuna araç kullanmadan cevap verebiliyorsan (örn. "Merhaba", "Teşekkürler") araç çağırmadan doğrudan yanıt ver.
+6. Telekomünikasyon dışı sorulara (hava durumu, tarih vb.) nazikçe hizmet kapsamın dışında olduğunu belirterek cevap ver.
+7. Yanıtlarını her zaman Türkçe ver."""),
+    MessagesPlaceholder("chat_history"),
+    ("human", "{input}"),
+    MessagesPlaceholder("agent_scratchpad"),
+])
+
+async def fetch_package_catalog() -> bytes:
+    """Yanıt önbelleğinin geçersiz kılınması için paket kataloğunu çeker"""
+    async with api_client("answer_cache_catalog") as client:
+        response = await client.get(f"{config.BACKEND_URL}/packages/")
+        response.raise_for_status()
+        return response.content
+
+# Katalog/SSS sorularının yanıtları için anlamsal önbellek
+answer_cache = AnswerCache(fetch_catalog=fetch_package_catalog)
+
+# Her turda prompt'a yalnızca ilgili araçları koyan seçici
+tool_selector = ToolSelector(tools)
+
+def agent_tools(selected: list = None) -> list:
+    """AGENT_MODE'a göre agent'e verilen araç listesi (selected verilirse yalnızca o araçlar)"""
+    candidates = tools if selected is None else selected
+    if config.AGENT_MODE != "tools":
+        return candidates
+    # Fonksiyon çağırmada son yanıt doğrudan asistan mesajıdır, final_answer gereksiz.
+    # Aynı adlı araçlardan AgentExecutor'daki gibi sonuncusu geçerli olur
+    unique = {t.name: t for t in candidates if t.name != "final_answer"}
+    return list(unique.values())
+
 # Agent'i modüler olarak oluştur
-agent = create_react_agent(llm=model, tools=tools, prompt=prompt)
+def build_agent(llm, selected: list = None):
+    """Verilen LLM ve araçlarla AGENT_MODE'a göre ReAct veya fonksiyon çağıran agent'i oluşturur"""
+    if config.AGENT_MODE == "tools":
+        return create_tool_calling_agent(llm=llm, tools=agent_tools(selected), prompt=tool_calling_prompt)
+    return create_react_agent(llm=llm, tools=agent_tools(selected), prompt=prompt)
+
+agent = build_agent(model)
+
+def configure_llm(llm):
+    """Agent'in kullandığı LLM'i değiştirir (benchmark'ta stub LLM için)"""
+    global model, agent
+    model = llm
+    agent = build_agent(llm)
 
 # Memory ile birlikte chat yapabilen fonksiyon
 @traceable(name="chat_with_memory")
-async def chat_with_memory(message: str, session_id: str = "default"):
-    """Memory kullanan chat fonksiyonu"""
-    memory = get_or_create_memory(session_id)
+async def chat_with_memory(message: str, session_id: str = "default", callbacks: list = None,
+                           deadline_seconds: float = None):
+    """Memory kullanan chat fonksiyonu; tur deadline_seconds (varsayılan TURN_DEADLINE_SECONDS) içinde biter"""
+    seconds = config.TURN_DEADLINE_SECONDS if deadline_seconds is None else deadline_seconds
+    # Kilit bekleme, önbellek, araç seçimi, agent ve geçmişin kaydı dahil turun tamamı ölçülür
+    with telemetry.span(telemetry.TURN_SECONDS), deadline.scope(seconds) as turn_deadline:
+        store = session_store.get_store()
+        # Aynı oturumun turları sıraya girer; geçmiş her turda depodan yüklenip geri yazılır
+        lock_wait = turn_deadline.remaining() if turn_deadline else None
+        try:
+            async with store.lock(session_id, wait=lock_wait):
+                memory = new_memory(await store.load(session_id))
+                history_length = len(memory.chat_memory.messages)
+                progress = deadline.TurnProgress(react=config.AGENT_MODE != "tools")
+                try:
+                    async with asyncio.timeout(turn_deadline.remaining() if turn_deadline else None) as timeout:
+                        return await _run_turn(message, session_id, memory, progress, callbacks)
+                except TimeoutError:
+                    if not timeout.expired():
+                        raise
+            
+                # Süre doldu: yarıda kalan yanıtın tamamlanmış cümleleri veya özür mesajı döner
+                components = deadline.record(turn_deadline.expired_in | (progress.running() or {turn_deadline.stage}))
+                partial = progress.partial_answer()
+                output = partial or deadline.FALLBACK_ANSWER
+                logger.warning("Tur süresi (%.1f sn) doldu, session=%s bileşenler=%s kısmi_yanıt=%s",
+                               turn_deadline.seconds, session_id, components, partial is not None)
+                # Tur kaydedilirken kesildiyse aynı mesaj iki kez yazılmasın
+                memory = new_memory(memory.chat_memory.messages[:history_length])
+                memory.save_context({"input": message}, {"output": output})
+                await store.save(session_id, memory.chat_memory.messages)
+                return {"input": message, "output": output, "deadline_exceeded": True,
+                        "partial": partial is not None, "deadline_components": components}
+        except session_store.SessionBusyError:
+            # Kilit beklemesini tur süresi sınırladıysa 409 yerine özür mesajı döner
+            if turn_deadline is None or lock_wait > store.lock_wait:
+                raise
+            components = deadline.record({"session_lock"})
+            logger.warning("Tur süresi (%.1f sn) oturum kilidi beklenirken doldu, session=%s",
+                           turn_deadline.seconds, session_id)
+            return {"input": message, "output": deadline.FALLBACK_ANSWER, "deadline_exceeded": True,
+                    "partial": False, "deadline_components": components}
+
+async def _run_turn(message: str, session_id: str, memory: ConversationBufferMemory,
+                    progress: deadline.TurnProgress, callbacks: list = None) -> dict:
+    """Oturum kilidi altında tek bir turu (önbellek, araç seçimi, agent) çalıştırır"""
+    store = session_store.get_store()
+    turn_start = time.perf_counter()
+    
+    # Kişiye özel olmayan sorularda önce benzer bir sorunun yanıtı aranır
+    lookup = None
+    has_history = bool(memory.chat_memory.messages)
+    if config.ANSWER_CACHE_ENABLED and is_cacheable(message, has_history=has_history):
+        deadline.enter("answer_cache")
+        lookup = await answer_cache.lookup(message)
+        if lookup.answer is not None:
+            memory.save_context({"input": message}, {"output": lookup.answer})
+            await store.save(session_id, memory.chat_memory.messages)
+            answer_cache.record("hit", time.perf_counter() - turn_start)
+            return {"input": message, "output": lookup.answer, "cached": True}
+    
+    # Prompt'u küçültmek için bu tura uygun araçları seç
+    turn_agent, selected = agent, None
+    if config.TOOL_SELECTION_ENABLED:
+        deadline.enter("tool_selection")
+        previous = [str(m.content) for m in memory.chat_memory.messages if m.type == "human"]
+        # Önbellek araması mesajı zaten encode ettiyse aynı vektör kullanılır
+        selected = await tool_selector.select(message, previous, lookup.vector if lookup else None)
+        turn_agent = build_agent(model, selected)
     
     # Executor ile çalıştır - memory parametresi dahil
     agent_executor = AgentExecutor(
-        agent=agent, 
-        tools=tools,
-        verbose=True,
+        agent=turn_agent, 
+        tools=agent_tools(selected),
+        verbose=config.AGENT_VERBOSE,
         handle_parsing_errors=True,
         max_iterations=3,  # 5'ten 3'e düşür
         memory=memory
     )
     
-    response = await agent_executor.ainvoke({
-        "input": message
-    })
+    deadline.enter("agent")
+    tool_recorder = ToolRecorder()
+    response = await agent_executor.ainvoke(
+        {"input": message},
+        config={"callbacks": [telemetry.TelemetryCallbackHandler(), tool_recorder, progress, *(callbacks or [])]}
+    )
     
+    await store.save(session_id, memory.chat_memory.messages)
+    if lookup is not None:
+        answer_cache.record("miss", time.perf_counter() - turn_start)
+        answer_cache.store(message, response.get("output"), lookup, tool_recorder, has_history)
+    else:
+        answer_cache.record("bypass", time.perf_counter() - turn_start)
+    if selected is not None:
+        response["selected_tools"] = [t.name for t in agent_tools(selected)]
     return response
 
 
@@ -711,4 +800,5 @@ async def main():
             print(f"❌ Hata: {e}")
 
 if __name__ == "__main__":
+    telemetry.setup_logging()
     asyncio.run(main())
\ No newline at end of file
@@ -0,0 +1,284 @@
+"""
+Araçların çağırdığı telekom backend'inin (localhost:8000/api/v1) yerel taklidi.
+
+Tüm rotalar sabit bir tohumdan üretilen sentetik verilerle yanıt verir; gecikme ve
+hata oranı başlangıçta veya çalışırken (/_mock/config) ayarlanabilir. Böylece
+api_server.py backend olmadan yük testine sokulabilir.
+
+Çalıştırma:
+    python mock_backend.py --port 8000 --latency-ms 30 --jitter-ms 20 --error-rate 0.01
+
+Ortam değişkenleri: MOCK_SEED, MOCK_USERS, MOCK_LATENCY_MS, MOCK_JITTER_MS, MOCK_ERROR_RATE
+"""
+import argparse
+import asyncio
+import datetime
+import random
+
+from fastapi import APIRouter, FastAPI, HTTPException, Request
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel
+
+import config
+from utils import lower_tr
+
+# Benchmark senaryolarında geçen numaralar her zaman kayıtlı olsun
+KNOWN_PHONES = ["05551234567", "05535891880", "05550001122", "05558887766", "05559876543", "05551112233"]
+
+FIRST_NAMES = ["Ahmet", "Mehmet", "Ayşe", "Fatma", "Elif", "Mustafa", "Zeynep", "Emre", "Can", "Deniz"]
+LAST_NAMES = ["Yılmaz", "Kaya", "Demir", "Şahin", "Çelik", "Yıldız", "Aydın", "Öztürk", "Arslan", "Koç"]
+LOCATIONS = ["Meram", "Selçuklu", "Karatay", "Kadıköy", "Beşiktaş", "Çankaya", "Konak", "Nilüfer"]
+
+PACKAGES = [
+    {"id": 1, "name": "Mobil 10GB", "type": "mobil", "price": 249.9, "data_gb": 10, "minutes": 500, "sms": 250},
+    {"id": 2, "name": "Mobil 25GB", "type": "mobil", "price": 349.9, "data_gb": 25, "minutes": 1000, "sms": 1000},
+    {"id": 3, "name": "Mobil Sınırsız Konuşma", "type": "mobil", "price": 449.9, "data_gb": 40, "minutes": 99999, "sms": 1000},
+    {"id": 4, "name": "Ev İnterneti 50Mbps", "type": "ev interneti", "price": 399.9, "speed_mbps": 50},
+    {"id": 5, "name": "Ev İnterneti 100Mbps", "type": "ev interneti", "price": 499.9, "speed_mbps": 100},
+    {"id": 6, "name": "Ev İnterneti 1000Mbps Fiber", "type": "ev interneti", "price": 799.9, "speed_mbps": 1000},
+    {"id": 7, "name": "Ekstra 5GB", "type": "ekstra", "price": 99.9, "data_gb": 5},
+    {"id": 8, "name": "Ekstra 250 Dakika", "type": "ekstra", "price": 79.9, "minutes": 250},
+    {"id": 9, "name": "Ekstra 500 SMS", "type": "ekstra", "price": 49.9, "sms": 500},
+]
+
+
+class MockSettings(BaseModel):
+    latency_ms: float = config.env_float("MOCK_LATENCY_MS", 20.0)
+    jitter_ms: float = config.env_float("MOCK_JITTER_MS", 10.0)
+    error_rate: float = config.env_float("MOCK_ERROR_RATE", 0.0)
+    seed: int = config.env_int("MOCK_SEED", 42)
+    users: int = config.env_int("MOCK_USERS", 1000)
+
+
+class NewUser(BaseModel):
+    name: str
+    phone: str
+
+
+def generate_data(seed: int, user_count: int) -> dict:
+    """Tohuma göre her seferinde aynı sentetik müşteri verisini üretir."""
+    rng = random.Random(seed)
+    today = datetime.date(2025, 8, 15)
+
+    phones = list(KNOWN_PHONES)
+    while len(phones) < user_count:
+        phone = f"05{rng.randint(300000000, 599999999)}"
+        if phone not in phones:
+            phones.append(phone)
+
+    users, subs, invoices, remaining, purchases = {}, {}, {}, {}, {}
+    for user_id, phone in enumerate(phones, 1):
+        package = rng.choice([p for p in PACKAGES if p["type"] != "ekstra"])
+        users[phone] = {
+            "id": user_id,
+            "name": f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}",
+            "phone": phone,
+            "package_id": package["id"],
+        }
+
+        start = today - datetime.timedelta(days=rng.randint(30, 700))
+        subs[phone] = {
+            "phone": phone,
+            "package": package["name"],
+            "start_date": start.isoformat(),
+            "renewal_date": (today + datetime.timedelta(days=rng.randint(1, 30))).isoformat(),
+            "commitment_end_date": (start + datetime.timedelta(days=365 * rng.choice([1, 2]))).isoformat(),
+        }
+
+        history = []
+        for month in range(6, 0, -1):
+            period = today.replace(day=1) - datetime.timedelta(days=30 * month)
+            extras = round(rng.choice([0, 0, 0, 49.9, 79.9, 99.9]), 2)
+            base = package["price"]
+            tax = round((base + extras) * 0.2, 2)
+            history.append({
+                "period": period.strftime("%Y-%m"),
+                "amount": round(base + extras + tax, 2),
+                "due_date": (period + datetime.timedelta(days=20)).isoformat(),
+                "paid": True,
+                "items": [
+                    {"description": package["name"], "amount": base},
+                    *([{"description": "Ek paket", "amount": extras}] if extras else []),
+                    {"description": "KDV ve ÖİV", "amount": tax},
+                ],
+            })
+        history[-1]["paid"] = rng.random() < 0.6
+        invoices[phone] = history
+
+        remaining[phone] = {
+            "phone": phone,
+            "data_gb": round(rng.uniform(0, package.get("data_gb", 100)), 1),
+            "minutes": rng.randint(0, min(package.get("minutes", 1000), 1000)),
+            "sms": rng.randint(0, package.get("sms", 1000)),
+            "period_end": (today + datetime.timedelta(days=rng.randint(1, 30))).isoformat(),
+        }
+
+        bought = rng.sample([p for p in PACKAGES if p["type"] == "ekstra"], k=rng.randint(0, 2))
+        purchases[phone] = [
+            {"name": p["name"], "price": p["price"],
+             "purchase_date": (today - datetime.timedelta(days=rng.randint(1, 90))).isoformat()}
+            for p in bought
+        ]
+
+    problems = {}
+    for location in rng.sample(LOCATIONS, k=3):
+        problems[lower_tr(location)] = [{
+            "location": location,
+            "type": rng.choice(["fiber kesintisi", "baz istasyonu arızası", "altyapı çalışması"]),
+            "status": rng.choice(["inceleniyor", "çözülüyor"]),
+            "estimated_fix": (today + datetime.timedelta(hours=rng.randint(2, 48))).isoformat(),
+        }]
+
+    return {"users": users, "subs": subs, "invoices": invoices, "remaining": remaining,
+            "purchases": purchases, "problems": problems}
+
+
+def create_app(settings: MockSettings = None) -> FastAPI:
+    settings = settings or MockSettings()
+    app = FastAPI(title="Mock Telecom Backend", version="1.0.0")
+    app.state.settings = settings
+    app.state.data = generate_data(settings.seed, settings.users)
+    app.state.rng = random.Random(settings.seed)
+
+    @app.middleware("http")
+    async def inject_latency_and_errors(request: Request, call_next):
+        if request.url.path.startswith("/_mock"):
+            return await call_next(request)
+        current = app.state.settings
+        rng = app.state.rng
+        delay = max(0.0, current.latency_ms + rng.uniform(-current.jitter_ms, current.jitter_ms))
+        if delay:
+            await asyncio.sleep(delay / 1000)
+        if current.error_rate and rng.random() < current.error_rate:
+            return JSONResponse(status_code=503, content={"detail": "Enjekte edilmiş hata"})
+        return await call_next(request)
+
+    api = APIRouter(prefix="/api/v1")
+
+    def _user(phone: str) -> dict:
+        user = app.state.data["users"].get(phone.strip())
+        if user is None:
+            raise HTTPException(status_code=404, detail="Kullanıcı bulunamadı")
+        return user
+
+    def _record(table: str, phone: str):
+        """Kullanıcıya ait kaydı döner; yeni kaydolmuş kullanıcıların henüz kaydı yoktur."""
+        _user(phone)
+        record = app.state.data[table].get(phone.strip())
+        if record is None:
+            raise HTTPException(status_code=404, detail="Kayıt bulunamadı")
+        return record
+
+    @api.get("/users/phone/{phone}")
+    async def get_user(phone: str):
+        return _user(phone)
+
+    @api.get("/users/phone/{phone}/package")
+    async def get_user_package(phone: str):
+        package_id = _user(phone)["package_id"]
+        package = next((p for p in PACKAGES if p["id"] == package_id), None)
+        if package is None:
+            raise HTTPException(status_code=404, detail="Aktif paket bulunamadı")
+        return package
+
+    @api.post("/users/", status_code=201)
+    async def create_user(new_user: NewUser):
+        phone = new_user.phone.replace(" ", "").replace("-", "")
+        if not phone.isdigit() or len(phone) != 11 or len(new_user.name.split()) < 2:
+            raise HTTPException(status_code=400, detail="Geçersiz kullanıcı bilgisi")
+        users = app.state.data["users"]
+        if phone in users:
+            raise HTTPException(status_code=409, detail="Telefon numarası zaten kayıtlı")
+        users[phone] = {"id": len(users) + 1, "name": new_user.name, "phone": phone, "package_id": None}
+        return users[phone]
+
+    @api.get("/packages/")
+    async def get_packages():
+        return PACKAGES
+
+    @api.get("/packages/{key}")
+    async def get_packages_by_type_or_name(key: str):
+        key = lower_tr(key.strip())
+        matches = [p for p in PACKAGES if lower_tr(p["type"]) == key or lower_tr(p["name"]) == key]
+        if not matches:
+            raise HTTPException(status_code=404, detail="Paket bulunamadı")
+        return matches
+
+    @api.get("/problems/location/{location}")
+    async def get_location_problems(location: str):
+        problems = app.state.data["problems"].get(lower_tr(location.strip()))
+        if not problems:
+            raise HTTPException(status_code=404, detail="Bölgede bilinen sorun yok")
+        return problems
+
+    @api.get("/subs/{phone}/activesub")
+    async def get_active_subscription(phone: str):
+        return _record("subs", phone)
+
+    @api.get("/invoices/phone/{phone}/activeinvoice")
+    async def get_active_invoice(phone: str):
+        invoice = _record("invoices", phone)[-1]
+        return {k: v for k, v in invoice.items() if k != "items"}
+
+    @api.get("/invoices/phone/{phone}/invoices")
+    async def get_invoices(phone: str):
+        return [{k: v for k, v in invoice.items() if k != "items"} for invoice in _record("invoices", phone)]
+
+    @api.get("/invoices/phone/{phone}/activeinvoice/items")
+    async def get_active_invoice_items(phone: str):
+        return _record("invoices", phone)[-1]["items"]
+
+    @api.get("/remaining-uses/phone/{phone}")
+    async def get_remaining_uses(phone: str):
+        return _record("remaining", phone)
+
+    @api.get("/service-purchases/phone/{phone}")
+    async def get_service_purchases(phone: str):
+        purchases = _record("purchases", phone)
+        if not purchases:
+            raise HTTPException(status_code=404, detail="Satın alınmış hizmet yok")
+        return purchases
+
+    app.include_router(api)
+
+    @app.get("/_mock/config")
+    async def get_mock_config():
+        return app.state.settings
+
+    @app.post("/_mock/config")
+    async def update_mock_config(update: dict):
+        """Gecikme/hata ayarlarını çalışırken değiştirir; seed veya users değişirse veri yeniden üretilir."""
+        current = app.state.settings.model_dump()
+        current.update(update)
+        new_settings = MockSettings(**current)
+        if (new_settings.seed, new_settings.users) != (app.state.settings.seed, app.state.settings.users):
+            app.state.data = generate_data(new_settings.seed, new_settings.users)
+            app.state.rng = random.Random(new_settings.seed)
+        app.state.settings = new_settings
+        return new_settings
+
+    return app
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Mock telekom backend'i")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=8000)
+    defaults = MockSettings()
+    parser.add_argument("--latency-ms", type=float, default=defaults.latency_ms)
+    parser.add_argument("--jitter-ms", type=float, default=defaults.jitter_ms)
+    parser.add_argument("--error-rate", type=float, default=defaults.error_rate)
+    parser.add_argument("--seed", type=int, default=defaults.seed)
+    parser.add_argument("--users", type=int, default=defaults.users)
+    args = parser.parse_args()
+
+    import uvicorn
+    settings = MockSettings(latency_ms=args.latency_ms, jitter_ms=args.jitter_ms,
+                            error_rate=args.error_rate, seed=args.seed, users=args.users)
+    print(f"🧪 Mock backend: http://localhost:{args.port}/api/v1 ({settings.users} kullanıcı, "
+          f"{settings.latency_ms}±{settings.jitter_ms} ms, hata oranı {settings.error_rate})")
+    uvicorn.run(create_app(settings), host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
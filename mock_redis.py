@@ -0,0 +1,172 @@
+"""
+Redis protokolünü (RESP) konuşan küçük, süreç içi bir Redis taklidi.
+
+session_store.RedisSessionStore'un Redis kurulu olmayan ortamlarda test ve benchmark
+edilebilmesi için yalnızca kullanılan komutları destekler:
+PING, AUTH, SELECT, GET, SET (EX/PX/NX/XX), DEL, EXISTS, PEXPIRE, PTTL, FLUSHDB, QUIT
+ve EVAL (yalnızca anahtarın değeri ARGV[1] ise tek bir komut çalıştıran betikler).
+
+Çalıştırma:
+    python mock_redis.py --port 6379
+"""
+import argparse
+import asyncio
+import re
+import time
+import typing
+
+
+# 'if redis.call("get", KEYS[1]) == ARGV[1] then return redis.call("del", KEYS[1]) else return 0 end'
+_GUARDED_SCRIPT = re.compile(
+    r'if redis\.call\("get", KEYS\[1\]\) == ARGV\[1\] then '
+    r'return redis\.call\("(\w+)", KEYS\[1\]((?:, ARGV\[\d+\])*)\) else return 0 end')
+
+
+class Status(bytes):
+    """RESP basit dize yanıtı (+OK, +PONG)."""
+
+
+class MockRedis:
+    def __init__(self):
+        # anahtar -> (değer, son kullanma zamanı veya None)
+        self.data: typing.Dict[bytes, typing.Tuple[bytes, typing.Optional[float]]] = {}
+
+    def _get(self, key: bytes) -> typing.Optional[bytes]:
+        item = self.data.get(key)
+        if item is None:
+            return None
+        value, expires_at = item
+        if expires_at is not None and expires_at <= time.monotonic():
+            del self.data[key]
+            return None
+        return value
+
+    def execute(self, args: typing.List[bytes]):
+        command = args[0].upper()
+        if command == b"PING":
+            return Status(b"PONG")
+        if command in (b"AUTH", b"SELECT"):
+            return Status(b"OK")
+        if command == b"GET":
+            return self._get(args[1])
+        if command == b"SET":
+            return self._set(args[1], args[2], [a.upper() for a in args[3:]], args[3:])
+        if command == b"DEL":
+            removed = 0
+            for key in args[1:]:
+                if self._get(key) is not None:
+                    del self.data[key]
+                    removed += 1
+            return removed
+        if command == b"EXISTS":
+            return sum(1 for key in args[1:] if self._get(key) is not None)
+        if command == b"PEXPIRE":
+            value = self._get(args[1])
+            if value is None:
+                return 0
+            self.data[args[1]] = (value, time.monotonic() + int(args[2]) / 1000)
+            return 1
+        if command == b"PTTL":
+            if self._get(args[1]) is None:
+                return -2
+            expires_at = self.data[args[1]][1]
+            return -1 if expires_at is None else int((expires_at - time.monotonic()) * 1000)
+        if command == b"EVAL":
+            return self._eval(args[1].decode(), int(args[2]), args[3:])
+        if command == b"FLUSHDB":
+            self.data.clear()
+            return Status(b"OK")
+        raise ValueError(f"desteklenmeyen komut '{command.decode()}'")
+
+    def _eval(self, script: str, key_count: int, rest: typing.List[bytes]):
+        """Lua yorumlamadan, GET ile korunan tek komutluk betikleri atomik olarak çalıştırır."""
+        match = _GUARDED_SCRIPT.fullmatch(script.strip())
+        if not match or key_count != 1:
+            raise ValueError("desteklenmeyen betik")
+        key, argv = rest[0], rest[1:]
+        if self._get(key) != argv[0]:
+            return 0
+        extra = [argv[int(i) - 1] for i in re.findall(r"ARGV\[(\d+)\]", match.group(2))]
+        return self.execute([match.group(1).upper().encode(), key, *extra])
+
+    def _set(self, key: bytes, value: bytes, options: typing.List[bytes], raw: typing.List[bytes]):
+        expires_at = None
+        if b"EX" in options:
+            expires_at = time.monotonic() + int(raw[options.index(b"EX") + 1])
+        if b"PX" in options:
+            expires_at = time.monotonic() + int(raw[options.index(b"PX") + 1]) / 1000
+        exists = self._get(key) is not None
+        if (b"NX" in options and exists) or (b"XX" in options and not exists):
+            return None
+        self.data[key] = (value, expires_at)
+        return Status(b"OK")
+
+
+def encode_reply(reply) -> bytes:
+    if reply is None:
+        return b"$-1\r\n"
+    if isinstance(reply, int):
+        return b":%d\r\n" % reply
+    if isinstance(reply, Status):
+        return b"+" + reply + b"\r\n"
+    return b"$%d\r\n%s\r\n" % (len(reply), reply)
+
+
+async def read_command(reader: asyncio.StreamReader) -> typing.Optional[typing.List[bytes]]:
+    line = await reader.readline()
+    if not line:
+        return None
+    if not line.startswith(b"*"):
+        # redis-cli'nin satır içi (inline) komutları
+        return line.strip().split()
+    args = []
+    for _ in range(int(line[1:])):
+        size = int((await reader.readline())[1:])
+        args.append((await reader.readexactly(size + 2))[:-2])
+    return args
+
+
+async def start_server(host: str = "127.0.0.1", port: int = 0, db: MockRedis = None) -> asyncio.AbstractServer:
+    """Sunucuyu başlatır; port=0 ise boş bir port seçilir (server.sockets[0].getsockname())."""
+    db = db or MockRedis()
+
+    async def handle(reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            while True:
+                args = await read_command(reader)
+                if not args:
+                    break
+                if args[0].upper() == b"QUIT":
+                    writer.write(b"+OK\r\n")
+                    break
+                try:
+                    writer.write(encode_reply(db.execute(args)))
+                except (ValueError, IndexError) as e:
+                    writer.write(f"-ERR {e}\r\n".encode())
+                await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError, asyncio.CancelledError):
+            # Sunucu kapanırken açık bağlantılar iptal edilir
+            pass
+        finally:
+            writer.close()
+
+    return await asyncio.start_server(handle, host, port)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Süreç içi Redis taklidi")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=6379)
+    args = parser.parse_args()
+
+    async def serve():
+        server = await start_server(args.host, args.port)
+        print(f"🧪 Mock Redis: redis://{args.host}:{args.port}/0")
+        async with server:
+            await server.serve_forever()
+
+    asyncio.run(serve())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,383 @@
+"""
+Geçmiş sohbet korpusu üzerinde e5 + FAISS ile benzer örnek arama.
+
+İki arama modu vardır:
+- "dialog": e5.index üzerinden en benzer sohbetlerin tüm transkriptini döner (eski davranış).
+- "turn": sohbetler ajan/müşteri değişim pencerelerine bölünerek ayrı bir indekste
+  (e5_turns.index + turn_chunks.csv) tutulur; arama yalnızca en ilgili birkaç
+  pencereyi, ait oldukları sohbet id'leri ile birlikte karakter bütçesi içinde döner.
+
+Tur indeksi bir kez oluşturulur:
+    python rag.py build
+
+Eski davranışla prompt boyutu ve gecikme karşılaştırması:
+    python rag.py compare [--llm]
+"""
+import argparse
+import asyncio
+import logging
+import os
+import re
+import threading
+import time
+import typing
+
+import config
+import telemetry
+from utils import estimate_tokens, percentile
+
+logger = logging.getLogger(__name__)
+
+_lock = threading.Lock()
+_model = None
+_dialog_resources = None
+_turn_resources = None
+_turn_index_missing_reported = False
+
+# "AJAN:", "MÜŞTERİ:", "Temsilci:" gibi konuşmacı etiketleri
+_SPEAKER_PATTERN = re.compile(r"^\s*([A-Za-zÇĞİÖŞÜçğıöşü ]{2,25}):")
+
+
+def _char_budget(char_budget: typing.Optional[int] = None) -> int:
+    budget = char_budget if char_budget is not None else config.RAG_CHAR_BUDGET
+    if config.RAG_TOKEN_BUDGET > 0:
+        budget = min(budget, int(config.RAG_TOKEN_BUDGET * config.CHARS_PER_TOKEN))
+    return budget
+
+
+def get_embedding_model():
+    """e5 modelini bir kez yükler ve paylaşır."""
+    global _model
+    if _model is None:
+        with _lock:
+            if _model is None:
+                from sentence_transformers import SentenceTransformer
+                _model = SentenceTransformer(config.EMBED_MODEL_NAME)
+    return _model
+
+
+def embed_query(text: str):
+    """Sorguyu e5 "query: " önekiyle normalize edilmiş tek bir vektöre çevirir."""
+    return get_embedding_model().encode([f"query: {text}"], normalize_embeddings=True)[0].astype("float32")
+
+
+def embed_passages(texts: typing.List[str]):
+    """Metinleri e5 "passage: " önekiyle normalize edilmiş vektörlere çevirir."""
+    return get_embedding_model().encode(
+        [f"passage: {text}" for text in texts], normalize_embeddings=True).astype("float32")
+
+
+def _load_dialog_resources():
+    global _dialog_resources
+    if _dialog_resources is None:
+        with _lock:
+            if _dialog_resources is None:
+                import faiss
+                import pandas as pd
+                index = faiss.read_index(config.DIALOG_INDEX_PATH)
+                data = pd.read_csv(config.DIALOGS_CSV_PATH, encoding="utf-8")
+                conv_ids = pd.read_csv(config.CONVERSATION_IDS_CSV_PATH, encoding="utf-8")
+                texts = dict(zip(data["conversation_id"], data["translated_tr"]))
+                _dialog_resources = (index, conv_ids["conversation_id"].tolist(), texts)
+    return _dialog_resources
+
+
+def _load_turn_resources():
+    global _turn_resources
+    if _turn_resources is None:
+        with _lock:
+            if _turn_resources is None:
+                import faiss
+                import pandas as pd
+                index = faiss.read_index(config.TURN_INDEX_PATH)
+                chunks = pd.read_csv(config.TURN_CHUNKS_CSV_PATH, encoding="utf-8")
+                if "turn_end" not in chunks.columns:
+                    logger.warning("%s eski biçimde (turn_end yok); 'python rag.py build' ile yeniden oluşturun.",
+                                   config.TURN_CHUNKS_CSV_PATH)
+                _turn_resources = (index, chunks.to_dict("records"))
+    return _turn_resources
+
+
+def turn_index_available() -> bool:
+    return os.path.exists(config.TURN_INDEX_PATH) and os.path.exists(config.TURN_CHUNKS_CSV_PATH)
+
+
+def warm_up():
+    """Embed modelini ve ayarlı moddaki indeksi önceden yükler."""
+    get_embedding_model()
+    if config.RAG_MODE == "turn" and turn_index_available():
+        _load_turn_resources()
+    else:
+        _load_dialog_resources()
+
+
+def split_exchanges(text: str,
+                    window: int = None,
+                    stride: int = None) -> typing.List[typing.Tuple[int, int, str]]:
+    """
+    Bir sohbet transkriptini ardışık konuşmacı mesajlarından oluşan pencerelere böler.
+
+    Returns:
+        (pencerenin başladığı mesaj numarası, bittiği mesaj numarası (hariç), pencere metni) listesi
+    """
+    window = window or config.RAG_WINDOW_LINES
+    stride = stride or config.RAG_WINDOW_STRIDE
+    if not isinstance(text, str):
+        return []
+
+    lines = []
+    for line in text.splitlines():
+        line = line.strip()
+        # Bazı çevirilerde aynı satır defalarca tekrar ediyor, tekrarları at
+        if line and (not lines or lines[-1] != line):
+            lines.append(line)
+    if not lines:
+        return []
+
+    # Hiç konuşmacı etiketi olmayan transkriptlerde her satır ayrı bir mesajdır;
+    # etiketli transkriptlerde etiketsiz satırlar önceki konuşmacının mesajının devamıdır
+    if not any(_SPEAKER_PATTERN.match(line) for line in lines):
+        turns = lines
+    else:
+        turns = []
+        for line in lines:
+            if turns and not _SPEAKER_PATTERN.match(line):
+                turns[-1] = f"{turns[-1]} {line}"
+            else:
+                turns.append(line)
+
+    # Tek başına bütçeyi aşan pencereleri kırp
+    max_chars = max(_char_budget(), 200)
+    chunks = []
+    for start in range(0, max(len(turns) - window + stride, 1), stride):
+        end = min(start + window, len(turns))
+        chunk = "\n".join(turns[start:end])[:max_chars]
+        if chunk:
+            chunks.append((start, end, chunk))
+    return chunks
+
+
+def build_turn_index(batch_size: int = 64) -> int:
+    """Korpusu pencerelere bölüp e5 ile embedler ve tur indeksini diske yazar."""
+    import faiss
+    import pandas as pd
+
+    data = pd.read_csv(config.DIALOGS_CSV_PATH, encoding="utf-8")
+    rows = []
+    for conversation_id, transcript in zip(data["conversation_id"], data["translated_tr"]):
+        for turn_start, turn_end, chunk in split_exchanges(transcript):
+            rows.append({
+                "chunk_id": len(rows),
+                "conversation_id": conversation_id,
+                "turn_start": turn_start,
+                # Çakışma kontrolü indeks oluşturulurkenki pencere boyunu kullanır, güncel ayarı değil
+                "turn_end": turn_end,
+                "text": chunk,
+            })
+
+    model = get_embedding_model()
+    vectors = model.encode(
+        [f"passage: {row['text']}" for row in rows],
+        batch_size=batch_size,
+        normalize_embeddings=True,
+        show_progress_bar=True,
+    ).astype("float32")
+
+    index = faiss.IndexFlatIP(vectors.shape[1])
+    index.add(vectors)
+    faiss.write_index(index, config.TURN_INDEX_PATH)
+    pd.DataFrame(rows).to_csv(config.TURN_CHUNKS_CSV_PATH, index=False, encoding="utf-8")
+    return len(rows)
+
+
+def search_dialogs(query: str, top_k: int = 2) -> typing.List[dict]:
+    """En benzer sohbetlerin tüm transkriptlerini döner (eski davranış)."""
+    model = get_embedding_model()
+    index, conv_ids, texts = _load_dialog_resources()
+
+    with telemetry.span(telemetry.RAG_STAGE_SECONDS, mode="dialog", stage="encode"):
+        query_vec = model.encode([query]).astype("float32")
+    with telemetry.span(telemetry.RAG_STAGE_SECONDS, mode="dialog", stage="search"):
+        distances, indices = index.search(query_vec, top_k)
+
+    results = []
+    with telemetry.span(telemetry.RAG_STAGE_SECONDS, mode="dialog", stage="lookup"):
+        for score, idx in zip(distances[0], indices[0]):
+            if 0 <= idx < len(conv_ids):
+                conversation_id = conv_ids[idx]
+                text = texts.get(conversation_id)
+                if isinstance(text, str):
+                    results.append({"conversation_id": conversation_id, "text": text, "score": float(score)})
+    return results
+
+
+def search_turns(query: str,
+                 top_k: int = None,
+                 char_budget: int = None) -> typing.List[dict]:
+    """
+    En ilgili konuşma pencerelerini döner.
+
+    Aynı sohbetten çakışan pencereler tekrar edilmez; sonuçların toplam uzunluğu
+    karakter bütçesini aşmaz (ilk sonuç gerekirse kırpılarak her zaman döner).
+    """
+    top_k = top_k or config.RAG_TOP_K
+    budget = _char_budget(char_budget)
+    model = get_embedding_model()
+    index, chunks = _load_turn_resources()
+
+    with telemetry.span(telemetry.RAG_STAGE_SECONDS, mode="turn", stage="encode"):
+        query_vec = model.encode([f"query: {query}"], normalize_embeddings=True).astype("float32")
+    with telemetry.span(telemetry.RAG_STAGE_SECONDS, mode="turn", stage="search"):
+        # Çakışan pencereler elenebileceği için fazladan aday al
+        distances, indices = index.search(query_vec, top_k * 4)
+
+    with telemetry.span(telemetry.RAG_STAGE_SECONDS, mode="turn", stage="lookup"):
+        return _select_turns(chunks, distances[0], indices[0], top_k, budget)
+
+
+def _select_turns(chunks, distances, indices, top_k: int, budget: int) -> typing.List[dict]:
+    """Aday pencerelerden çakışmayan ve bütçeye sığanları skor sırasıyla seçer."""
+    results = []
+    used = 0
+    seen_turns = set()
+    for score, idx in zip(distances, indices):
+        if idx < 0 or idx >= len(chunks):
+            continue
+        chunk = chunks[idx]
+        conversation_id = chunk["conversation_id"]
+        turn_start = int(chunk["turn_start"])
+        # turn_end sütunu olmayan eski indekslerde güncel pencere boyu varsayılır
+        turn_end = chunk.get("turn_end")
+        covered = range(turn_start, int(turn_end) if turn_end is not None else turn_start + config.RAG_WINDOW_LINES)
+        if any((conversation_id, t) in seen_turns for t in covered):
+            continue
+
+        text = chunk["text"]
+        if used + len(text) > budget:
+            if results:
+                continue
+            text = text[:budget]
+        seen_turns.update((conversation_id, t) for t in covered)
+        results.append({
+            "conversation_id": conversation_id,
+            "turn_start": turn_start,
+            "text": text,
+            "score": float(score),
+        })
+        used += len(text)
+        if len(results) >= top_k:
+            break
+    return results
+
+
+def search(query: str, mode: str = None) -> typing.List[dict]:
+    """Ayarlı moda göre arama yapar; tur indeksi yoksa sohbet moduna düşer."""
+    global _turn_index_missing_reported
+    mode = mode or config.RAG_MODE
+    if mode == "turn":
+        if turn_index_available():
+            return search_turns(query)
+        if not _turn_index_missing_reported:
+            _turn_index_missing_reported = True
+            logger.warning("Tur indeksi bulunamadı, tüm sohbet araması kullanılıyor. 'python rag.py build' ile oluşturun.")
+    return search_dialogs(query)
+
+
+def format_results(query: str, results: typing.List[dict]) -> str:
+    if not results:
+        return "Bu sorgu için benzer sohbet örneği bulunamadı."
+
+    response = f"📚 **Benzer Sohbet Örnekleri** ('{query}' için):\n\n"
+    for i, result in enumerate(results, 1):
+        response += f"**Örnek {i}** (sohbet {result['conversation_id']}):\n{result['text']}\n\n"
+
+    response += "💡 **Öneriler:**\n"
+    response += "- Bu örnekleri baz alarak müşteriye samimi ve yardımcı bir ton kullan\n"
+    response += "- Benzer durumlardan öğrenilen çözüm yöntemlerini uygula\n"
+    response += "- Müşterinin ihtiyacına göre bu örneklerdeki yaklaşımı adapte et\n"
+    return response
+
+
+def retrieve(query: str, mode: str = None) -> str:
+    """rag_search aracının döndürdüğü biçimlendirilmiş metni üretir."""
+    return format_results(query, search(query, mode))
+
+
+# ---- Karşılaştırma ----
+
+def _default_queries() -> typing.List[str]:
+    import pandas as pd
+    path = os.path.join(config.BASE_DIR, "llm_agent_test_scenarios_benchmark.xlsx")
+    scenarios = pd.read_excel(path)
+    return scenarios["user_input"].dropna().astype(str).tolist()
+
+
+async def _time_llm(context: str, query: str) -> float:
+    from main import model
+    start = time.perf_counter()
+    await model.ainvoke(f"{context}\n\nMüşteri sorusu: {query}\nKısa bir yanıt ver.")
+    return time.perf_counter() - start
+
+
+def compare(queries: typing.List[str], with_llm: bool = False) -> dict:
+    """Sohbet ve tur modlarında prompt boyutu ile gecikmeyi ölçer."""
+    # Model ve indeksleri ısıt, ilk yükleme süresi ölçüme karışmasın
+    get_embedding_model()
+    _load_dialog_resources()
+    _load_turn_resources()
+
+    report = {}
+    for mode in ("dialog", "turn"):
+        chars, tokens, retrieval_ms, llm_ms = [], [], [], []
+        for query in queries:
+            start = time.perf_counter()
+            text = retrieve(query, mode)
+            retrieval_ms.append((time.perf_counter() - start) * 1000)
+            chars.append(len(text))
+            tokens.append(estimate_tokens(text))
+            if with_llm:
+                llm_ms.append(asyncio.run(_time_llm(text, query)) * 1000)
+
+        report[mode] = {
+            "queries": len(queries),
+            "avg_chars": sum(chars) / len(chars),
+            "avg_tokens": sum(tokens) / len(tokens),
+            "max_tokens": max(tokens),
+            "retrieval_p50_ms": percentile(retrieval_ms, 50),
+            "retrieval_p95_ms": percentile(retrieval_ms, 95),
+        }
+        if llm_ms:
+            total_ms = [r + l for r, l in zip(retrieval_ms, llm_ms)]
+            report[mode]["llm_p50_ms"] = percentile(llm_ms, 50)
+            report[mode]["end_to_end_p50_ms"] = percentile(total_ms, 50)
+            report[mode]["end_to_end_p95_ms"] = percentile(total_ms, 95)
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="RAG indeks oluşturma ve karşılaştırma")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    subparsers.add_parser("build", help="Tur bazlı indeksi oluştur")
+    compare_parser = subparsers.add_parser("compare", help="Sohbet ve tur modlarını karşılaştır")
+    compare_parser.add_argument("queries", nargs="*", help="Sorgular (varsayılan: benchmark senaryoları)")
+    compare_parser.add_argument("--llm", action="store_true", help="Bağlamı LLM'e göndererek uçtan uca süreyi de ölç")
+    args = parser.parse_args()
+
+    if args.command == "build":
+        start = time.perf_counter()
+        count = build_turn_index()
+        print(f"✅ {count} pencere indekslendi ({time.perf_counter() - start:.1f} sn)")
+        print(f"   {config.TURN_INDEX_PATH}\n   {config.TURN_CHUNKS_CSV_PATH}")
+        return
+
+    queries = args.queries or _default_queries()
+    report = compare(queries, with_llm=args.llm)
+    print(f"{'mod':<8}{'ort. karakter':>15}{'ort. token':>12}{'maks token':>12}{'arama p50 ms':>14}{'uçtan uca p50 ms':>18}")
+    for mode, row in report.items():
+        e2e = row.get("end_to_end_p50_ms")
+        print(f"{mode:<8}{row['avg_chars']:>15.0f}{row['avg_tokens']:>12.0f}{row['max_tokens']:>12}"
+              f"{row['retrieval_p50_ms']:>14.1f}{(f'{e2e:.0f}' if e2e is not None else '-'):>18}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,497 @@
+"""
+Konuşma geçmişi için paylaşılan oturum depoları.
+
+Geçmiş süreç belleğinde tutulduğunda birden fazla uvicorn worker'ı veya sunucu ile
+çalışılamaz: müşterinin ikinci turu geçmişini hiç görmemiş bir worker'a düşebilir.
+SESSION_STORE ile seçilen depo her turda geçmişi yükler ve kaydeder:
+
+    memory  süreç içi sözlük (tek worker, varsayılan)
+    sqlite  dosya tabanlı (aynı makinedeki worker'lar), SESSION_SQLITE_PATH
+    redis   Redis protokolü (birden fazla makine), SESSION_REDIS_URL
+
+Aynı oturumun eşzamanlı turları birbirine karışmasın diye her tur oturum kilidi
+altında çalışır; sqlite ve redis depolarında kilit süreçler arasıdır ve kiralıdır
+(SESSION_LOCK_TTL_SECONDS), böylece çöken bir worker kilidi sonsuza kadar tutamaz. Kira,
+tur sürdükçe TTL'nin üçte biri aralıklarla yenilenir.
+
+Depo başına eklenen tur gecikmesi:
+    python session_store.py --turns 8 --sessions 200 --concurrency 16
+"""
+import argparse
+import asyncio
+import contextlib
+import json
+import logging
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+import typing
+import urllib.parse
+import uuid
+import weakref
+
+from langchain_core.messages import AIMessage, BaseMessage, HumanMessage, SystemMessage
+
+import config
+from utils import percentile
+
+logger = logging.getLogger(__name__)
+
+# Mesaj tipleri tek harfle saklanır: [["h", "Merhaba"], ["a", "Size nasıl yardımcı olabilirim?"]]
+_TYPE_CODES = {"human": "h", "ai": "a", "system": "s"}
+_MESSAGE_CLASSES = {"h": HumanMessage, "a": AIMessage, "s": SystemMessage}
+
+
+class SessionBusyError(Exception):
+    """Oturumun önceki turu SESSION_LOCK_WAIT_SECONDS içinde bitmedi."""
+
+
+class SessionStoreError(Exception):
+    """Depoya erişilemedi veya depo hata döndü."""
+
+
+def dump_messages(messages: typing.List[BaseMessage]) -> bytes:
+    return json.dumps(
+        [[_TYPE_CODES.get(m.type, "h"), m.content] for m in messages],
+        ensure_ascii=False, separators=(",", ":"),
+    ).encode("utf-8")
+
+
+def load_messages(data: typing.Optional[bytes]) -> typing.List[BaseMessage]:
+    if not data:
+        return []
+    return [_MESSAGE_CLASSES[code](content=content) for code, content in json.loads(data)]
+
+
+class SessionStore:
+    """Depoların ortak arayüzü; alt sınıflar _get/_set/_delete ve gerekirse kilit kirasını uygular."""
+
+    # Süreçler arası kira kullanan depolarda kira, tur sürdükçe yenilenir
+    uses_lease = False
+
+    def __init__(self, ttl_seconds: int = None, lock_ttl: float = None, lock_wait: float = None):
+        self.ttl_seconds = ttl_seconds if ttl_seconds is not None else config.SESSION_TTL_SECONDS
+        self.lock_ttl = lock_ttl if lock_ttl is not None else config.SESSION_LOCK_TTL_SECONDS
+        self.lock_wait = lock_wait if lock_wait is not None else config.SESSION_LOCK_WAIT_SECONDS
+        # Aynı süreçteki turlar önce yerel kilitte sıraya girer, süreçler arası kilidi yoklamaz
+        self._local_locks: "weakref.WeakValueDictionary[str, asyncio.Lock]" = weakref.WeakValueDictionary()
+
+    async def load(self, session_id: str) -> typing.List[BaseMessage]:
+        return load_messages(await self._get(session_id))
+
+    async def save(self, session_id: str, messages: typing.List[BaseMessage]):
+        await self._set(session_id, dump_messages(messages))
+
+    async def delete(self, session_id: str) -> bool:
+        """Oturumu siler; oturum yoksa False döner."""
+        return await self._delete(session_id)
+
+    async def ping(self):
+        await self._get("__ping__")
+
+    @contextlib.asynccontextmanager
+    async def lock(self, session_id: str, wait: float = None):
+        """Oturumun turlarını sıraya sokar; wait verilirse lock_wait'ten kısa olduğunda o kadar beklenir."""
+        wait = self.lock_wait if wait is None else min(wait, self.lock_wait)
+        # Yerel kilit ve süreçler arası kira aynı bekleme süresini paylaşır
+        deadline = time.monotonic() + wait
+        local_lock = self._local_locks.get(session_id)
+        if local_lock is None:
+            local_lock = self._local_locks[session_id] = asyncio.Lock()
+        try:
+            await asyncio.wait_for(local_lock.acquire(), timeout=max(deadline - time.monotonic(), 0))
+        except asyncio.TimeoutError:
+            raise SessionBusyError(session_id) from None
+        try:
+            token = uuid.uuid4().hex
+            delay = 0.01
+            while not await self._acquire_lease(session_id, token):
+                if time.monotonic() >= deadline:
+                    raise SessionBusyError(session_id)
+                await asyncio.sleep(min(delay, max(deadline - time.monotonic(), 0)))
+                delay = min(delay * 2, 0.25)
+            renewal = asyncio.create_task(self._keep_lease(session_id, token)) if self.uses_lease else None
+            try:
+                yield
+            finally:
+                if renewal:
+                    renewal.cancel()
+                await self._release_lease(session_id, token)
+        finally:
+            local_lock.release()
+
+    async def _keep_lease(self, session_id: str, token: str):
+        """Tur kira süresinden uzun sürerse kilit başka bir worker'a geçmesin diye kirayı yeniler."""
+        while True:
+            await asyncio.sleep(self.lock_ttl / 3)
+            try:
+                if not await self._renew_lease(session_id, token):
+                    logger.warning("Oturum kilidinin kirası kaybedildi: %s", session_id)
+                    return
+            except SessionStoreError as e:
+                logger.warning("Oturum kilidinin kirası yenilenemedi (%s): %s", session_id, e)
+
+    async def close(self):
+        pass
+
+    # Süreç içi depoda yerel kilit yeterlidir
+    async def _acquire_lease(self, session_id: str, token: str) -> bool:
+        return True
+
+    async def _release_lease(self, session_id: str, token: str):
+        pass
+
+    async def _renew_lease(self, session_id: str, token: str) -> bool:
+        return True
+
+    async def _get(self, session_id: str) -> typing.Optional[bytes]:
+        raise NotImplementedError
+
+    async def _set(self, session_id: str, data: bytes):
+        raise NotImplementedError
+
+    async def _delete(self, session_id: str) -> bool:
+        raise NotImplementedError
+
+
+class InMemorySessionStore(SessionStore):
+    """Tek süreçlik depo; mesaj listeleri serileştirilmeden tutulur."""
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        # session_id -> (mesajlar, son erişim)
+        self._sessions: typing.Dict[str, typing.Tuple[typing.List[BaseMessage], float]] = {}
+
+    async def load(self, session_id: str) -> typing.List[BaseMessage]:
+        item = self._sessions.get(session_id)
+        if item is None or item[1] + self.ttl_seconds < time.monotonic():
+            self._sessions.pop(session_id, None)
+            return []
+        return list(item[0])
+
+    async def save(self, session_id: str, messages: typing.List[BaseMessage]):
+        self._sessions[session_id] = (list(messages), time.monotonic())
+
+    async def _get(self, session_id: str):
+        return None
+
+    async def _delete(self, session_id: str) -> bool:
+        return self._sessions.pop(session_id, None) is not None
+
+
+class SQLiteSessionStore(SessionStore):
+    """Aynı dosyayı paylaşan süreçler için depo; kilitler session_locks tablosunda kiralanır."""
+
+    uses_lease = True
+
+    def __init__(self, path: str = None, **kwargs):
+        super().__init__(**kwargs)
+        self.path = path or config.SESSION_SQLITE_PATH
+        self._conn = sqlite3.connect(self.path, timeout=10, isolation_level=None, check_same_thread=False)
+        # Bağlantı thread'ler arasında paylaşıldığı için erişim sıraya alınır
+        self._conn_lock = threading.Lock()
+        with self._conn_lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS sessions "
+                "(session_id TEXT PRIMARY KEY, data BLOB NOT NULL, expires_at REAL NOT NULL)")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS session_locks "
+                "(session_id TEXT PRIMARY KEY, token TEXT NOT NULL, expires_at REAL NOT NULL)")
+            self._conn.execute("DELETE FROM sessions WHERE expires_at < ?", (time.time(),))
+
+    def _execute(self, sql: str, params: tuple = ()) -> sqlite3.Cursor:
+        with self._conn_lock:
+            return self._conn.execute(sql, params)
+
+    def _fetchone(self, sql: str, params: tuple = ()) -> typing.Optional[tuple]:
+        with self._conn_lock:
+            return self._conn.execute(sql, params).fetchone()
+
+    async def _get(self, session_id: str) -> typing.Optional[bytes]:
+        row = await asyncio.to_thread(
+            self._fetchone, "SELECT data FROM sessions WHERE session_id = ? AND expires_at >= ?",
+            (session_id, time.time()))
+        return row[0] if row else None
+
+    async def _set(self, session_id: str, data: bytes):
+        await asyncio.to_thread(
+            self._execute, "INSERT OR REPLACE INTO sessions VALUES (?, ?, ?)",
+            (session_id, data, time.time() + self.ttl_seconds))
+
+    async def _delete(self, session_id: str) -> bool:
+        cursor = await asyncio.to_thread(
+            self._execute, "DELETE FROM sessions WHERE session_id = ? AND expires_at >= ?",
+            (session_id, time.time()))
+        return cursor.rowcount > 0
+
+    def _try_lease(self, session_id: str, token: str) -> bool:
+        now = time.time()
+        with self._conn_lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._conn.execute(
+                    "DELETE FROM session_locks WHERE session_id = ? AND expires_at < ?", (session_id, now))
+                cursor = self._conn.execute(
+                    "INSERT OR IGNORE INTO session_locks VALUES (?, ?, ?)", (session_id, token, now + self.lock_ttl))
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        return cursor.rowcount == 1
+
+    async def _acquire_lease(self, session_id: str, token: str) -> bool:
+        return await asyncio.to_thread(self._try_lease, session_id, token)
+
+    async def _release_lease(self, session_id: str, token: str):
+        await asyncio.to_thread(
+            self._execute, "DELETE FROM session_locks WHERE session_id = ? AND token = ?", (session_id, token))
+
+    async def _renew_lease(self, session_id: str, token: str) -> bool:
+        cursor = await asyncio.to_thread(
+            self._execute, "UPDATE session_locks SET expires_at = ? WHERE session_id = ? AND token = ?",
+            (time.time() + self.lock_ttl, session_id, token))
+        return cursor.rowcount == 1
+
+    async def close(self):
+        with self._conn_lock:
+            self._conn.close()
+
+
+class RedisClient:
+    """Yalnızca ihtiyaç duyulan komutlar için küçük bir RESP istemcisi (bağlantı havuzlu)."""
+
+    def __init__(self, url: str):
+        parsed = urllib.parse.urlparse(url)
+        self.host = parsed.hostname or "localhost"
+        self.port = parsed.port or 6379
+        self.password = parsed.password
+        self.db = int(parsed.path.lstrip("/") or 0)
+        self._idle: typing.List[typing.Tuple[asyncio.StreamReader, asyncio.StreamWriter]] = []
+
+    async def _connect(self):
+        try:
+            connection = await asyncio.open_connection(self.host, self.port)
+        except OSError as e:
+            raise SessionStoreError(f"Redis'e bağlanılamadı ({self.host}:{self.port}): {e}") from e
+        if self.password:
+            await self._roundtrip(connection, ("AUTH", self.password))
+        if self.db:
+            await self._roundtrip(connection, ("SELECT", self.db))
+        return connection
+
+    @staticmethod
+    async def _roundtrip(connection, args: tuple):
+        reader, writer = connection
+        parts = [b"*%d\r\n" % len(args)]
+        for arg in args:
+            value = arg if isinstance(arg, bytes) else str(arg).encode("utf-8")
+            parts.append(b"$%d\r\n%s\r\n" % (len(value), value))
+        writer.write(b"".join(parts))
+        await writer.drain()
+        return await RedisClient._read_reply(reader)
+
+    @staticmethod
+    async def _read_reply(reader: asyncio.StreamReader):
+        line = await reader.readline()
+        if not line:
+            raise ConnectionError("Redis bağlantısı kapandı")
+        kind, payload = line[:1], line[1:-2]
+        if kind == b"+":
+            return payload.decode()
+        if kind == b"-":
+            raise SessionStoreError(payload.decode())
+        if kind == b":":
+            return int(payload)
+        if kind == b"$":
+            size = int(payload)
+            return None if size < 0 else (await reader.readexactly(size + 2))[:-2]
+        if kind == b"*":
+            size = int(payload)
+            return None if size < 0 else [await RedisClient._read_reply(reader) for _ in range(size)]
+        raise SessionStoreError(f"Beklenmeyen Redis yanıtı: {line!r}")
+
+    async def execute(self, *args):
+        connection = self._idle.pop() if self._idle else await self._connect()
+        try:
+            reply = await self._roundtrip(connection, args)
+        except SessionStoreError:
+            # Hata yanıtı tam okundu, bağlantı kullanılabilir
+            self._idle.append(connection)
+            raise
+        except (ConnectionError, asyncio.IncompleteReadError) as e:
+            connection[1].close()
+            raise SessionStoreError(f"Redis isteği başarısız: {e}") from e
+        except BaseException:
+            # Yanıtı yarıda kalan bağlantı havuza geri konmaz
+            connection[1].close()
+            raise
+        self._idle.append(connection)
+        return reply
+
+    async def close(self):
+        while self._idle:
+            self._idle.pop()[1].close()
+
+
+# Kilit hâlâ bu turun token'ındaysa tek adımda silen/uzatan betikler; GET ile ardından gelen
+# DEL arasında kira dolup kilit başka bir worker'a geçerse onun kilidi silinmesin
+RELEASE_SCRIPT = 'if redis.call("get", KEYS[1]) == ARGV[1] then return redis.call("del", KEYS[1]) else return 0 end'
+RENEW_SCRIPT = ('if redis.call("get", KEYS[1]) == ARGV[1] then return redis.call("pexpire", KEYS[1], ARGV[2]) '
+                'else return 0 end')
+
+
+class RedisSessionStore(SessionStore):
+    """Redis protokolü ile paylaşılan depo; kilit SET NX PX ile kiralanır."""
+
+    uses_lease = True
+
+    def __init__(self, url: str = None, prefix: str = "callcenter", **kwargs):
+        super().__init__(**kwargs)
+        self.client = RedisClient(url or config.SESSION_REDIS_URL)
+        self.prefix = prefix
+
+    def _key(self, session_id: str) -> str:
+        return f"{self.prefix}:session:{session_id}"
+
+    def _lock_key(self, session_id: str) -> str:
+        return f"{self.prefix}:lock:{session_id}"
+
+    async def ping(self):
+        await self.client.execute("PING")
+
+    async def _get(self, session_id: str) -> typing.Optional[bytes]:
+        return await self.client.execute("GET", self._key(session_id))
+
+    async def _set(self, session_id: str, data: bytes):
+        await self.client.execute("SET", self._key(session_id), data, "EX", self.ttl_seconds)
+
+    async def _delete(self, session_id: str) -> bool:
+        return await self.client.execute("DEL", self._key(session_id)) > 0
+
+    async def _acquire_lease(self, session_id: str, token: str) -> bool:
+        reply = await self.client.execute(
+            "SET", self._lock_key(session_id), token, "NX", "PX", int(self.lock_ttl * 1000))
+        return reply == "OK"
+
+    async def _release_lease(self, session_id: str, token: str):
+        await self.client.execute("EVAL", RELEASE_SCRIPT, 1, self._lock_key(session_id), token)
+
+    async def _renew_lease(self, session_id: str, token: str) -> bool:
+        reply = await self.client.execute(
+            "EVAL", RENEW_SCRIPT, 1, self._lock_key(session_id), token, int(self.lock_ttl * 1000))
+        return reply == 1
+
+    async def close(self):
+        await self.client.close()
+
+
+def create_store(kind: str = None, **kwargs) -> SessionStore:
+    kind = kind or config.SESSION_STORE
+    if kind == "memory":
+        return InMemorySessionStore(**kwargs)
+    if kind == "sqlite":
+        return SQLiteSessionStore(**kwargs)
+    if kind == "redis":
+        return RedisSessionStore(**kwargs)
+    raise ValueError(f"Bilinmeyen SESSION_STORE: {kind} (memory, sqlite veya redis olmalı)")
+
+
+_store: typing.Optional[SessionStore] = None
+
+
+def get_store() -> SessionStore:
+    """SESSION_STORE ayarına göre süreç genelinde paylaşılan depoyu döner."""
+    global _store
+    if _store is None:
+        _store = create_store()
+    return _store
+
+
+def set_store(store: SessionStore):
+    """Depoyu değiştirir (benchmark ve testler için)."""
+    global _store
+    _store = store
+
+
+# ---- Depo başına tur gecikmesi ölçümü ----
+
+async def _bench_store(store: SessionStore, args) -> dict:
+    """Her tur: kilit al, geçmişi yükle, iki mesaj ekle, kaydet, kilidi bırak."""
+    latencies = []
+    sizes = []
+    user_message = "Son faturamın bilgilerini öğrenmek istiyorum, numaram 05551234567"
+    agent_message = "Aktif faturanız 349,90 TL olup son ödeme tarihi ayın 25'idir. " * 3
+    semaphore = asyncio.Semaphore(args.concurrency)
+
+    async def run_session(session_no: int):
+        session_id = f"bench-{uuid.uuid4().hex[:8]}-{session_no}"
+        async with semaphore:
+            for _ in range(args.turns):
+                start = time.perf_counter()
+                async with store.lock(session_id):
+                    messages = await store.load(session_id)
+                    messages += [HumanMessage(content=user_message), AIMessage(content=agent_message)]
+                    await store.save(session_id, messages)
+                latencies.append((time.perf_counter() - start) * 1000)
+            sizes.append(len(dump_messages(messages)))
+            await store.delete(session_id)
+
+    start = time.perf_counter()
+    await asyncio.gather(*[run_session(i) for i in range(args.sessions)])
+    elapsed = time.perf_counter() - start
+    return {
+        "turns": len(latencies),
+        "turns_per_second": len(latencies) / elapsed,
+        "p50_ms": percentile(latencies, 50),
+        "p95_ms": percentile(latencies, 95),
+        "p99_ms": percentile(latencies, 99),
+        "bytes_per_session": sum(sizes) / len(sizes),
+    }
+
+
+async def _bench(args) -> typing.Dict[str, dict]:
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        server = None
+        redis_url = args.redis_url
+        if not redis_url:
+            import mock_redis
+            server = await mock_redis.start_server()
+            host, port = server.sockets[0].getsockname()[:2]
+            redis_url = f"redis://{host}:{port}/0"
+        stores = {
+            "memory": InMemorySessionStore(),
+            "sqlite": SQLiteSessionStore(os.path.join(tmp, "sessions.db")),
+            "redis": RedisSessionStore(redis_url, prefix=f"bench-{uuid.uuid4().hex[:6]}"),
+        }
+        for name in args.stores.split(","):
+            results[name] = await _bench_store(stores[name], args)
+            await stores[name].close()
+        if server:
+            server.close()
+            await server.wait_closed()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Oturum depolarının tur başına ek gecikmesi")
+    parser.add_argument("--stores", default="memory,sqlite,redis")
+    parser.add_argument("--sessions", type=int, default=200)
+    parser.add_argument("--turns", type=int, default=8)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--redis-url", default=None, help="Boşsa süreç içi mock_redis kullanılır")
+    args = parser.parse_args()
+
+    results = asyncio.run(_bench(args))
+    print(f"\n{'depo':<10}{'tur':>8}{'tur/sn':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'bayt/oturum':>14}")
+    for name, row in results.items():
+        print(f"{name:<10}{row['turns']:>8}{row['turns_per_second']:>10.0f}{row['p50_ms']:>10.2f}"
+              f"{row['p95_ms']:>10.2f}{row['p99_ms']:>10.2f}{row['bytes_per_session']:>14.0f}")
+
+
+if __name__ == "__main__":
+    main()
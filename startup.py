@@ -0,0 +1,170 @@
+"""
+API sunucusunun ağır başlangıç işleri ve hazır olma (readiness) durumu.
+
+Whisper modeli, LangChain agent'i (main.py), e5 retriever'ı ile LLM ve backend
+erişilebilirlik kontrolleri import sırasında değil, sunucu açıldıktan sonra paralel
+başlangıç görevleri olarak çalışır. Her bileşenin durumu ve süresi /ready ve
+/api/v1/startup uç noktalarından izlenebilir.
+"""
+import asyncio
+import importlib
+import logging
+import time
+import typing
+
+import httpx
+
+import config
+
+logger = logging.getLogger(__name__)
+
+# Modül import edildiği an; başlangıç raporunda import süresini de göstermek için
+PROCESS_IMPORT_STARTED = time.perf_counter()
+
+
+class Component:
+    """Tek bir başlangıç görevinin durumu."""
+
+    def __init__(self, name: str, loader: typing.Callable[[], typing.Any], required: bool, blocking: bool):
+        self.name = name
+        self.loader = loader
+        self.required = required
+        # Bloklayan (CPU/disk) yükleyiciler thread'de, diğerleri event loop'ta çalışır
+        self.blocking = blocking
+        self.status = "pending"
+        self.error: typing.Optional[str] = None
+        self.started_at: typing.Optional[float] = None
+        self.seconds: typing.Optional[float] = None
+        self.value = None
+
+    @property
+    def ready(self) -> bool:
+        return self.status == "ready"
+
+    def as_dict(self, origin: float) -> dict:
+        return {
+            "status": self.status,
+            "required": self.required,
+            "started_at_s": round(self.started_at - origin, 3) if self.started_at else None,
+            "seconds": round(self.seconds, 3) if self.seconds is not None else None,
+            "error": self.error,
+        }
+
+
+class Startup:
+    """Başlangıç görevlerini paralel çalıştırır ve sonuçlarını tutar."""
+
+    def __init__(self):
+        self.components: typing.Dict[str, Component] = {}
+        self.started_at: typing.Optional[float] = None
+        self.finished_at: typing.Optional[float] = None
+
+    def add(self, name: str, loader, required: bool = True, blocking: bool = True):
+        self.components[name] = Component(name, loader, required, blocking)
+
+    def get(self, name: str):
+        """Hazırsa bileşenin yüklediği değeri, değilse None döner."""
+        component = self.components.get(name)
+        return component.value if component and component.ready else None
+
+    async def _run_component(self, component: Component):
+        component.status = "loading"
+        component.error = None
+        component.started_at = time.perf_counter()
+        try:
+            if component.blocking:
+                component.value = await asyncio.to_thread(component.loader)
+            else:
+                component.value = await component.loader()
+            component.status = "ready"
+        except Exception as e:
+            component.status = "failed"
+            component.error = f"{type(e).__name__}: {e}"
+            logger.warning("Başlangıç görevi başarısız: %s - %s", component.name, component.error)
+        finally:
+            component.seconds = time.perf_counter() - component.started_at
+
+    async def run(self):
+        self.started_at = time.perf_counter()
+        await asyncio.gather(*[self._run_component(c) for c in self.components.values()])
+        self.finished_at = time.perf_counter()
+        logger.info("Başlangıç tamamlandı: %s", self.report())
+
+    async def retry_failed(self):
+        """Başarısız bileşenleri (örn. geç açılan LLM sunucusu) yeniden dener."""
+        failed = [c for c in self.components.values() if c.status == "failed"]
+        await asyncio.gather(*[self._run_component(c) for c in failed])
+
+    @property
+    def ready(self) -> bool:
+        return all(c.ready for c in self.components.values() if c.required)
+
+    @property
+    def failed(self) -> typing.List[str]:
+        """Başarısız olan (zorunlu olsun olmasın) bileşenlerin adları."""
+        return [name for name, c in self.components.items() if c.status == "failed"]
+
+    def report(self) -> dict:
+        origin = PROCESS_IMPORT_STARTED
+        return {
+            "ready": self.ready,
+            "import_seconds": round(self.started_at - origin, 3) if self.started_at else None,
+            "startup_seconds": round(self.finished_at - self.started_at, 3) if self.finished_at else None,
+            # Görevler paralel çalıştığı için toplam süre, tekil sürelerin toplamından kısadır
+            "sequential_seconds": round(sum(c.seconds or 0 for c in self.components.values()), 3),
+            "components": {name: c.as_dict(origin) for name, c in self.components.items()},
+        }
+
+
+# ---- Varsayılan görevler ----
+
+def load_agent():
+    """LangChain yığınını ve agent'i yükler (main.py import'u)."""
+    return importlib.import_module("main")
+
+
+def load_whisper():
+    import whisper
+    return whisper.load_model(config.WHISPER_MODEL)
+
+
+def load_retriever():
+    """e5 modelini ve RAG indeksini yükler, araç seçimi için araç açıklaması vektörlerini hesaplar."""
+    import rag
+    rag.warm_up()
+    if config.TOOL_SELECTION_ENABLED:
+        importlib.import_module("main").tool_selector.prepare()
+    return True
+
+
+async def check_llm():
+    async with httpx.AsyncClient(timeout=config.STARTUP_CHECK_TIMEOUT) as client:
+        response = await client.get(f"{config.LLM_BASE_URL}/models",
+                                    headers={"Authorization": f"Bearer {config.LLM_API_KEY}"})
+        response.raise_for_status()
+        return True
+
+
+async def check_backend():
+    async with httpx.AsyncClient(timeout=config.STARTUP_CHECK_TIMEOUT) as client:
+        response = await client.get(f"{config.BACKEND_URL}/packages/")
+        response.raise_for_status()
+        return True
+
+
+async def check_session_store():
+    import session_store
+    await asyncio.wait_for(session_store.get_store().ping(), timeout=config.STARTUP_CHECK_TIMEOUT)
+    return True
+
+
+def create_default_startup() -> Startup:
+    required = set(config.READINESS_REQUIRED)
+    startup = Startup()
+    startup.add("agent", load_agent, required="agent" in required)
+    startup.add("whisper", load_whisper, required="whisper" in required)
+    startup.add("retriever", load_retriever, required="retriever" in required)
+    startup.add("llm", check_llm, required="llm" in required, blocking=False)
+    startup.add("backend", check_backend, required="backend" in required, blocking=False)
+    startup.add("sessions", check_session_store, required="sessions" in required, blocking=False)
+    return startup
@@ -0,0 +1,165 @@
+"""
+Sıcak yol için zamanlama ölçümleri ve loglama ayarları.
+
+LLM çağrıları, araç çağrıları (araç adı ve HTTP durumu ile), RAG aşamaları ve
+Whisper transkripsiyonu Prometheus histogramlarına yazılır; api_server.py bunları
+/metrics üzerinden sunar. Birden fazla uvicorn worker'ı ile çalışırken
+PROMETHEUS_MULTIPROC_DIR ayarlanırsa tüm worker'ların ölçümleri birleştirilir.
+"""
+import contextlib
+import json
+import logging
+import os
+import time
+import typing
+
+import httpx
+from langchain_core.callbacks import AsyncCallbackHandler
+from prometheus_client import CONTENT_TYPE_LATEST, CollectorRegistry, Counter, Histogram, generate_latest
+
+import config
+from utils import estimate_tokens
+
+logger = logging.getLogger(__name__)
+
+# Yerel LLM turları saniyeler sürdüğü için varsayılan kovalar yukarı doğru genişletildi
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 40, 80)
+
+TURN_SECONDS = Histogram(
+    "agent_turn_seconds", "Bir chat turunun toplam süresi", buckets=LATENCY_BUCKETS)
+LLM_CALL_SECONDS = Histogram(
+    "agent_llm_call_seconds", "LLM çağrı süresi", ["status"], buckets=LATENCY_BUCKETS)
+LLM_PROMPT_TOKENS = Histogram(
+    "agent_llm_prompt_tokens", "LLM çağrısı başına tahmini prompt tokenı",
+    buckets=(250, 500, 1000, 2000, 3000, 4000, 6000, 8000, 16000))
+TOOL_CALL_SECONDS = Histogram(
+    "agent_tool_call_seconds", "Araç çağrısı süresi", ["tool", "status"], buckets=LATENCY_BUCKETS)
+TOOL_HTTP_SECONDS = Histogram(
+    "agent_tool_http_seconds", "Araçların backend HTTP istek süresi", ["tool", "status"], buckets=LATENCY_BUCKETS)
+RAG_STAGE_SECONDS = Histogram(
+    "agent_rag_stage_seconds", "RAG aşama süreleri (encode, search, lookup)", ["mode", "stage"],
+    buckets=LATENCY_BUCKETS)
+TRANSCRIBE_SECONDS = Histogram(
+    "whisper_transcribe_seconds", "Whisper transkripsiyon süresi", ["status"], buckets=LATENCY_BUCKETS)
+ANSWER_CACHE_LOOKUP_SECONDS = Histogram(
+    "agent_answer_cache_lookup_seconds", "Yanıt önbelleği arama süresi (katalog kontrolü + e5 + benzerlik)",
+    buckets=LATENCY_BUCKETS)
+ANSWER_CACHE_REQUESTS = Counter(
+    "agent_answer_cache_requests_total", "Yanıt önbelleği sonuçları (hit, miss, bypass)", ["result"])
+DEADLINE_EXCEEDED = Counter(
+    "agent_deadline_exceeded_total", "Tur süresi dolduğunda çalışmakta olan bileşenler", ["component"])
+PARSE_ERRORS = Counter(
+    "agent_parse_errors_total", "ReAct çıktısı ayrıştırılamayan LLM adımları")
+
+
+def tool_schema_tokens(invocation_params: typing.Optional[dict]) -> int:
+    """Fonksiyon çağırma modunda modele ayrıca gönderilen araç şemalarının tahmini token sayısı."""
+    tools = (invocation_params or {}).get("tools")
+    return estimate_tokens(json.dumps(tools, ensure_ascii=False)) if tools else 0
+
+
+def setup_logging():
+    """LOG_LEVEL ortam değişkenine göre loglamayı ayarlar (varsayılan WARNING)."""
+    logging.basicConfig(
+        level=config.LOG_LEVEL,
+        format="%(asctime)s %(levelname)s %(name)s: %(message)s",
+    )
+
+
+@contextlib.contextmanager
+def span(histogram: Histogram, **labels):
+    """Bloğun süresini histograma yazar; hata olursa varsa 'status' etiketi 'error' olur."""
+    start = time.perf_counter()
+    try:
+        yield labels
+    except BaseException:
+        if "status" in labels:
+            labels["status"] = "error"
+        raise
+    finally:
+        elapsed = time.perf_counter() - start
+        (histogram.labels(**labels) if labels else histogram).observe(elapsed)
+        logger.debug("%s %s %.1f ms", histogram.describe()[0].name, labels, elapsed * 1000)
+
+
+class InstrumentedTransport(httpx.AsyncBaseTransport):
+    """Backend isteklerinin süresini araç adı ve HTTP durum koduyla ölçer."""
+
+    def __init__(self, tool_name: str, transport: httpx.AsyncBaseTransport = None):
+        self.tool_name = tool_name
+        # Paylaşılan (benchmark/test) transport'u istemci kapanınca kapatma
+        self._owns_transport = transport is None
+        self._transport = transport or httpx.AsyncHTTPTransport()
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        start = time.perf_counter()
+        status = "error"
+        try:
+            response = await self._transport.handle_async_request(request)
+            status = str(response.status_code)
+            return response
+        except httpx.TimeoutException:
+            status = "timeout"
+            raise
+        finally:
+            elapsed = time.perf_counter() - start
+            TOOL_HTTP_SECONDS.labels(tool=self.tool_name, status=status).observe(elapsed)
+            logger.debug("%s HTTP %s (%.1f ms)", self.tool_name, status, elapsed * 1000)
+
+    async def aclose(self):
+        if self._owns_transport:
+            await self._transport.aclose()
+
+
+class TelemetryCallbackHandler(AsyncCallbackHandler):
+    """Agent'in LLM ve araç çağrılarını LangChain callback'leri üzerinden ölçer."""
+
+    def __init__(self):
+        self._started: typing.Dict[typing.Any, typing.Tuple[float, str]] = {}
+
+    async def on_chat_model_start(self, serialized, messages, *, run_id, **kwargs):
+        self._started[run_id] = (time.perf_counter(), "llm")
+        LLM_PROMPT_TOKENS.observe(sum(estimate_tokens(str(m.content)) for batch in messages for m in batch)
+                                  + tool_schema_tokens(kwargs.get("invocation_params")))
+
+    async def on_llm_start(self, serialized, prompts, *, run_id, **kwargs):
+        self._started[run_id] = (time.perf_counter(), "llm")
+        LLM_PROMPT_TOKENS.observe(sum(estimate_tokens(p) for p in prompts))
+
+    async def on_llm_end(self, response, *, run_id, **kwargs):
+        self._finish_llm(run_id, "ok")
+
+    async def on_llm_error(self, error, *, run_id, **kwargs):
+        self._finish_llm(run_id, "error")
+
+    def _finish_llm(self, run_id, status: str):
+        started = self._started.pop(run_id, None)
+        if started:
+            LLM_CALL_SECONDS.labels(status=status).observe(time.perf_counter() - started[0])
+
+    async def on_tool_start(self, serialized, input_str, *, run_id, **kwargs):
+        name = (serialized or {}).get("name") or "unknown"
+        if name.startswith("_"):
+            PARSE_ERRORS.inc()
+        self._started[run_id] = (time.perf_counter(), name)
+
+    async def on_tool_end(self, output, *, run_id, **kwargs):
+        self._finish_tool(run_id, "ok")
+
+    async def on_tool_error(self, error, *, run_id, **kwargs):
+        self._finish_tool(run_id, "error")
+
+    def _finish_tool(self, run_id, status: str):
+        started = self._started.pop(run_id, None)
+        if started:
+            TOOL_CALL_SECONDS.labels(tool=started[1], status=status).observe(time.perf_counter() - started[0])
+
+
+def render_metrics() -> typing.Tuple[bytes, str]:
+    """Prometheus metin formatında ölçümleri ve content-type'ı döndürür."""
+    if os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+        from prometheus_client import multiprocess
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return generate_latest(registry), CONTENT_TYPE_LATEST
+    return generate_latest(), CONTENT_TYPE_LATEST
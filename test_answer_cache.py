@@ -0,0 +1,23 @@
+import numpy as np
+
+from answer_cache import AnswerCache, CacheLookup, ToolRecorder, is_cacheable
+
+
+def lookup() -> CacheLookup:
+    vector = np.ones(4, dtype="float32") / 2
+    return CacheLookup(vector=vector)
+
+
+def test_stores_first_turn_answer():
+    cache = AnswerCache()
+    cache.store("Mobil paketleriniz neler?", "Mobil paketlerimiz şunlardır...", lookup(), ToolRecorder())
+    assert len(cache) == 1
+
+
+def test_skips_answer_from_turn_with_history():
+    # Mesaj tek başına önbelleğe uygundur ama agent geçmişteki ad/telefonu yanıta katabilir
+    assert is_cacheable("Mobil paketleriniz neler?", has_history=True)
+    cache = AnswerCache()
+    cache.store("Mobil paketleriniz neler?", "Ahmet Bey, 05551234567 hattınız için uygun paketler...",
+                lookup(), ToolRecorder(), has_history=True)
+    assert len(cache) == 0
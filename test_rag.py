@@ -0,0 +1,20 @@
+import config
+import rag
+
+
+def test_split_exchanges_records_window_end():
+    text = "\n".join(f"Müşteri: soru {i}" for i in range(5))
+    windows = rag.split_exchanges(text, window=4, stride=2)
+    assert [(start, end) for start, end, _ in windows] == [(0, 4), (2, 5)]
+
+
+def test_select_turns_uses_indexed_window_length(monkeypatch):
+    # İndeks 2 mesajlık pencerelerle oluşturuldu; ayar sonradan 4'e çıkarıldı
+    monkeypatch.setattr(config, "RAG_WINDOW_LINES", 4)
+    chunks = [
+        {"conversation_id": "c1", "turn_start": 0, "turn_end": 2, "text": "a"},
+        {"conversation_id": "c1", "turn_start": 2, "turn_end": 4, "text": "b"},
+        {"conversation_id": "c1", "turn_start": 1, "turn_end": 3, "text": "c"},
+    ]
+    results = rag._select_turns(chunks, [0.9, 0.8, 0.7], [0, 1, 2], top_k=3, budget=1000)
+    assert [r["text"] for r in results] == ["a", "b"]
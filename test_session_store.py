@@ -0,0 +1,33 @@
+import asyncio
+import time
+
+import pytest
+
+import session_store
+
+
+def test_lock_wait_covers_local_lock_and_lease(tmp_path):
+    path = str(tmp_path / "sessions.db")
+    holder = session_store.SQLiteSessionStore(path)
+    waiter = session_store.SQLiteSessionStore(path)
+
+    async def attempt(wait: float) -> float:
+        started = time.monotonic()
+        with pytest.raises(session_store.SessionBusyError):
+            async with waiter.lock("s", wait=wait):
+                pass
+        return time.monotonic() - started
+
+    async def run():
+        # Diğer worker kirayı tutarken aynı süreçteki ilk tur yerel kilidi alıp kirayı bekler;
+        # ikinci tur önce yerel kilidi, sonra kirayı bekler ve toplamda wait'i aşmamalıdır
+        async with holder.lock("s"):
+            first = asyncio.create_task(attempt(0.6))
+            await asyncio.sleep(0.3)
+            second = await attempt(0.6)
+            await first
+        await holder.close()
+        await waiter.close()
+        return second
+
+    assert asyncio.run(run()) < 0.8
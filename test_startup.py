@@ -0,0 +1,46 @@
+import asyncio
+
+import api_server
+import config
+from startup import Startup
+
+
+def flaky_loader(failures: int):
+    """İlk `failures` çağrıda hata veren, sonra başarılı olan yükleyici."""
+    calls = {"count": 0}
+
+    def loader():
+        calls["count"] += 1
+        if calls["count"] <= failures:
+            raise ConnectionError("henüz açık değil")
+        return True
+
+    return loader, calls
+
+
+def test_warm_up_retries_failed_component(monkeypatch):
+    loader, calls = flaky_loader(failures=1)
+    startup = Startup()
+    startup.add("llm", loader)
+    monkeypatch.setattr(api_server, "startup", startup)
+    monkeypatch.setattr(config, "STARTUP_RETRY_SECONDS", 0.01)
+
+    asyncio.run(asyncio.wait_for(api_server.warm_up(), timeout=5))
+
+    assert startup.ready
+    assert startup.failed == []
+    assert calls["count"] == 2
+
+
+def test_warm_up_retries_optional_component(monkeypatch):
+    loader, calls = flaky_loader(failures=2)
+    startup = Startup()
+    startup.add("agent", lambda: True)
+    startup.add("retriever", loader, required=False)
+    monkeypatch.setattr(api_server, "startup", startup)
+    monkeypatch.setattr(config, "STARTUP_RETRY_SECONDS", 0.01)
+
+    asyncio.run(asyncio.wait_for(api_server.warm_up(), timeout=5))
+
+    assert startup.components["retriever"].ready
+    assert calls["count"] == 3
@@ -0,0 +1,138 @@
+"""
+Her tur için prompt'a konacak araçların seçimi.
+
+ReAct prompt'u tüm araçların adını ve uzun Türkçe açıklamalarını her turda {tools}
+içine koyar; bu, yerel modelde her LLM çağrısına sabit ve büyük bir prefill maliyeti
+ekler. ToolSelector mesaja ve oturum durumuna göre yalnızca ilgili araçları seçer:
+
+- final_answer, rag_search ve request_phone_number her zaman sunulur.
+- Anahtar kelime kuralları açık niyetleri (fatura, kalan kullanım, arıza...) yakalar.
+- Telefon numarası gerektiren araçlar ancak numara mesajda veya geçmişte varsa sunulur;
+  yoksa model request_phone_number ile numarayı ister.
+- Kurallara ek olarak önceden hesaplanmış araç açıklaması vektörlerine e5 benzerliği en
+  yüksek TOOL_SELECTION_TOP_K araç eklenir. Açıklama vektörleri sunucu başlangıcında
+  (startup'taki retriever görevi) prepare() ile hesaplanır.
+"""
+import asyncio
+import logging
+import re
+import typing
+
+import numpy as np
+
+import config
+from utils import PHONE_PATTERN, lower_tr
+
+logger = logging.getLogger(__name__)
+
+ALWAYS_OFFERED = {"final_answer", "rag_search", "request_phone_number"}
+
+# Müşterinin telefon numarası bilinmeden çağrılamayan araçlar
+PHONE_TOOLS = {
+    "control_by_phonenumber", "get_package_by_usernumber", "get_current_subscription_by_usernumber",
+    "get_active_invoice_by_usernumber", "get_user_invoices_by_usernumber", "get_active_invoice_items",
+    "get_user_remainining_uses", "get_service_purchase", "post_new_user",
+}
+
+RULES = {
+    "get_all_package": r"paket|tarife|kampanya|öner|seçenek|yeni müşteri",
+    "get_packages_by_type": r"mobil|ev interneti|ekstra|fiber|ek paket|öner|uygun",
+    "get_package_by_name": r"adlı|isimli|\d+ ?gb|\d+ ?mbps",
+    "get_package_by_usernumber": r"paketim|mevcut paket|hangi paket|paket(imi)? (yükselt|değiştir)",
+    "request_user_info": r"kayıt ol|kaydol|yeni müşteri|müşteri(si)? olmak|yeni (bir )?hat|abone ol",
+    "post_new_user": r"kayıt ol|kaydol|yeni müşteri|müşteri(si)? olmak|yeni (bir )?hat|abone ol|\badım\b",
+    "control_by_phonenumber": r"kayıtlı|bilgi(lerim|mi)|hesab|iptal",
+    "control_location_have_problem": r"arıza|bölge|lokasyon|yavaş|kesinti|çekmiyor|sorun|hız",
+    "get_user_remainining_uses": r"kalan|hakk|bitti|bitmiş|dakika|\bsms\b|\bgb\b|yurt ?dışı|son kullanım",
+    "get_service_purchase": r"ek hizmet|satın al|ek alım|ek paket",
+    "get_active_invoice_by_usernumber": r"fatura|borç|ödeme",
+    "get_active_invoice_items": r"fatura.*(detay|kalem|içeriğ|pahalı|neden|ücret)|(detay|kalem|pahalı).*fatura",
+    "get_user_invoices_by_usernumber": r"fatura.*(geçmiş|önceki|ödenmemiş|tüm)|(geçmiş|önceki|ödenmemiş).*fatura",
+    "get_current_subscription_by_usernumber": r"abonel|taahhüt|sözleşme|yenilen",
+}
+_RULE_PATTERNS = {name: re.compile(pattern) for name, pattern in RULES.items()}
+
+
+class ToolSelector:
+    def __init__(self,
+                 tools: list,
+                 embed: typing.Callable[[str], np.ndarray] = None,
+                 top_k: int = None):
+        self.tools = tools
+        # embed verilirse hem sorular hem açıklamalar için kullanılır; yoksa e5 (query/passage önekli)
+        self.embed = embed
+        self.top_k = top_k if top_k is not None else config.TOOL_SELECTION_TOP_K
+        self._names: typing.List[str] = []
+        self._vectors: typing.Optional[np.ndarray] = None
+        self._embedding_failed = False
+        self._lock = asyncio.Lock()
+
+    def _describe(self, tool) -> str:
+        return f"{tool.name}: {' '.join(tool.description.split())[:600]}"
+
+    def _encode_descriptions(self) -> typing.Tuple[typing.List[str], np.ndarray]:
+        unique = {tool.name: tool for tool in self.tools if tool.name not in ALWAYS_OFFERED}
+        texts = [self._describe(tool) for tool in unique.values()]
+        if self.embed is not None:
+            vectors = np.stack([self.embed(text) for text in texts])
+        else:
+            import rag
+            vectors = rag.embed_passages(texts)
+        return list(unique), vectors.astype("float32")
+
+    def _encode_query(self, text: str) -> np.ndarray:
+        if self.embed is not None:
+            return self.embed(text)
+        import rag
+        return rag.embed_query(text)
+
+    def prepare(self):
+        """Araç açıklaması vektörlerini önceden hesaplar (başlangıçta, müşteri isteği dışında)."""
+        if self._vectors is None:
+            self._names, self._vectors = self._encode_descriptions()
+
+    async def _similarities(self, text: str, query: np.ndarray = None) -> typing.Dict[str, float]:
+        """Araç adı -> benzerlik; vektörler üretilemiyorsa boş sözlük (yalnızca kurallar kullanılır)."""
+        if self._embedding_failed or self.top_k <= 0:
+            return {}
+        try:
+            if self._vectors is None:
+                # Başlangıçta hazırlanamadıysa (örn. retriever henüz yüklenmedi) ilk turda hesaplanır
+                async with self._lock:
+                    if self._vectors is None:
+                        self._names, self._vectors = await asyncio.to_thread(self._encode_descriptions)
+            if query is None:
+                query = await asyncio.to_thread(self._encode_query, text)
+        except Exception as e:
+            logger.warning("Araç seçimi için vektörler üretilemedi, yalnızca kurallar kullanılacak: %s", e)
+            self._embedding_failed = True
+            return {}
+        return dict(zip(self._names, (self._vectors @ query).tolist()))
+
+    async def select(self, message: str, previous_messages: typing.List[str] = None,
+                     query_vector: np.ndarray = None) -> list:
+        """
+        Mesaj ve önceki kullanıcı mesajlarına göre bu turda sunulacak araçları döner (özgün sırayla).
+
+        query_vector verilirse (yanıt önbelleğinin aynı tur için ürettiği mesaj vektörü) soru
+        yeniden encode edilmez; önbelleğe uygun mesajlar önceki turlara atıf yapmadığından
+        yalnızca mesajın vektörü yeterlidir.
+        """
+        previous_messages = previous_messages or []
+        # "Numaram 0555..." gibi kısa yanıtlarda niyet bir önceki mesajdadır
+        context = " ".join(previous_messages[-1:] + [message])
+        text = lower_tr(context)
+        phone_known = any(PHONE_PATTERN.search(m) for m in previous_messages + [message])
+
+        eligible = {tool.name for tool in self.tools
+                    if tool.name not in ALWAYS_OFFERED and (phone_known or tool.name not in PHONE_TOOLS)}
+        chosen = {name for name, pattern in _RULE_PATTERNS.items() if name in eligible and pattern.search(text)}
+
+        scores = await self._similarities(context, query_vector)
+        ranked = sorted((name for name in scores if name in eligible and name not in chosen),
+                        key=scores.get, reverse=True)
+        chosen.update(ranked[:self.top_k])
+
+        selected = [tool for tool in self.tools if tool.name in ALWAYS_OFFERED or tool.name in chosen]
+        logger.debug("Seçilen araçlar (%d/%d): %s", len(selected), len(self.tools), [t.name for t in selected])
+        return selected
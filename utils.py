@@ -0,0 +1,30 @@
+"""RAG, benchmark ve ölçüm araçlarının ortak kullandığı küçük yardımcılar."""
+import re
+import typing
+
+import config
+
+
+# Türk cep telefonu numarası (0 önekli veya öneksiz, boşluk/tire ile ayrılmış olabilir)
+PHONE_PATTERN = re.compile(r"(?<!\d)0?5\d{2}[ -]?\d{3}[ -]?\d{2}[ -]?\d{2}(?!\d)")
+
+
+def lower_tr(text: str) -> str:
+    """Türkçe büyük/küçük harf kurallarıyla (İ->i, I->ı) küçük harfe çevirir."""
+    return text.replace("İ", "i").replace("I", "ı").lower()
+
+
+def estimate_tokens(text: str) -> int:
+    """Metnin yaklaşık token sayısını döndürür (tokenizer yüklemeden)."""
+    if not text:
+        return 0
+    return int(len(text) / config.CHARS_PER_TOKEN) + 1
+
+
+def percentile(values: typing.List[float], p: float) -> float:
+    """En yakın sıra yöntemiyle yüzdelik değer (boş listede 0)."""
+    ordered = sorted(values)
+    if not ordered:
+        return 0.0
+    k = min(len(ordered) - 1, max(0, int(round(p / 100 * (len(ordered) - 1)))))
+    return ordered[k]